@@ -9,6 +9,22 @@ __doc__="""
 import vanilla
 import os
 import re
+import sys
+import json
+import unicodedata
+import heapq
+import bisect
+import difflib
+import hashlib
+import marshal
+import struct
+import importlib.util
+import tempfile
+import threading
+import time
+import contextlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from GlyphsApp import *
 from GlyphsApp.plugins import *
 import os
@@ -16,116 +32,870 @@ from Foundation import NSURL
 from AppKit import NSWorkspace
 import traceback
 import objc
+from PyObjCTools import AppHelper
 
-class ScriptFinderTool:
-    def __init__(self):
-        self.debug_mode = False  # 調試模式開關
+SCRIPTS_DIRECTORY = os.path.expanduser('~/Library/Application Support/Glyphs 3/Scripts')
+CACHE_DIRECTORY = os.path.expanduser('~/Library/Caches/com.YinTzuYuan.ScriptFinder')
 
-        # 根據 Glyphs 版本獲取 GSScriptingHandler
-        if int(Glyphs.versionNumber) == 3:
-            self.GSScriptingHandler = objc.lookUpClass("GSScriptingHandler")
-        else:
-            self.GSScriptingHandler = objc.lookUpClass("GSMenu")
-            
-        # 取得腳本資訊
-        self.scripts_info = self.get_scripts_info()
+# 偏好設定
+# 掃描執行緒數，設為 1 則依序掃描；可在巨集面板中設定：
+# Glyphs.defaults["com.YinTzuYuan.ScriptFinder.scanWorkers"] = 4
+SCAN_WORKERS_KEY = "com.YinTzuYuan.ScriptFinder.scanWorkers"
+DEFAULT_SCAN_WORKERS = 8
+# 掃描時排除的檔案與資料夾，語法同 .gitignore（以 / 開頭表示相對於 Scripts 資料夾）：
+# Glyphs.defaults["com.YinTzuYuan.ScriptFinder.excludePatterns"] = ["/vanilla/", ".git/", "tests/"]
+EXCLUDE_PATTERNS_KEY = "com.YinTzuYuan.ScriptFinder.excludePatterns"
+DEFAULT_EXCLUDE_PATTERNS = [
+    "/fontTools/",
+    "/robofab/",
+    "/vanilla/",
+    ".git/",
+    ".svn/",
+    ".hg/",
+    "__pycache__/",
+    ".venv/",
+    "venv/",
+    "site-packages/",
+    "node_modules/",
+    "*.egg-info/",
+]
 
-        # 設定初始大小和最小大小
-        initial_width = 600
-        initial_height = 400
-        min_width = 400
-        min_height = 300
+# 腳本資訊的解析規則
+MENU_TITLE_PATTERN = re.compile(r'^#\s*MenuTitle:\s*(.+)$', re.MULTILINE)
+DOC_START_PATTERN = re.compile(r'__doc__\s*=\s*"""')
+DOC_PATTERN = re.compile(r'__doc__\s*=\s*"""([\s\S]*?)"""')
+VANILLA_IMPORT_PATTERN = re.compile(r'^(?!#).*(?:import\s+vanilla|from\s+vanilla\s+import)', re.MULTILINE)
+HEADER_END_PREFIXES = ('def ', 'class ', '@')
 
-        # 建立 GUI
-        self.w = vanilla.Window((initial_width, initial_height), "腳本搜尋器", minSize=(min_width, min_height))
+# 搜尋結果最多顯示的數量（空白查詢時顯示全部）
+MAX_SEARCH_RESULTS = 500
+# 搜尋語法：欄位篩選（author:名稱 name:名稱 desc:說明 gui:yes/no）與排除（-字詞、-author:名稱），
+# 其餘的字詞照原本的方式搜尋；值中有空格時以雙引號包住，例如 author:"Yin Tzu Yuan"
+QUERY_FIELDS = {
+    'name': 'script_name',
+    'title': 'script_name',
+    'author': 'author',
+    'desc': 'description',
+    'description': 'description',
+}
+QUERY_GUI_FIELD = 'gui'
+QUERY_TRUE_VALUES = ('yes', 'true', '1')
+QUERY_FALSE_VALUES = ('no', 'false', '0')
+QUERY_TOKEN_PATTERN = re.compile(r'(?:[^\s"]|"[^"]*"?)+')
+# 自動更新：是否監看腳本資料夾並在變更時自動重新整理
+WATCH_SCRIPTS_KEY = "com.YinTzuYuan.ScriptFinder.watchScripts"
+WATCH_INTERVAL = 2.0         # 檢查資料夾修改時間的間隔（秒）
+WATCH_FULL_CHECK_EVERY = 5   # 每幾次檢查比對一次所有檔案的修改時間，以偵測原地修改的檔案
 
-        # 搜尋欄
-        self.w.searchBox = vanilla.SearchBox((10, 10, -60, 20), placeholder="搜尋腳本...", callback=self.search_scripts)
+# 背景掃描時每批送到列表的腳本數量上限
+SCAN_BATCH_SIZE = 200
+# 偵測重複腳本時，計算內容雜湊每次讀取的位元組數
+FINGERPRINT_CHUNK_SIZE = 1 << 16
+# 停止輸入多久後才開始搜尋（秒）
+SEARCH_DEBOUNCE_DELAY = 0.12
+# 掃描時列表的更新頻率（秒）：第一批結果立即顯示，之後最多每隔此時間以目前的搜尋條件更新一次
+SCAN_LIST_UPDATE_INTERVAL = 0.25
+# 列表一次顯示的腳本數量，其餘的以「顯示更多結果」列分頁載入
+LIST_PAGE_SIZE = 200
+# 列表以差異更新（逐列插入、刪除），變動的列數超過此值或列表過長時直接整個替換
+LIST_DIFF_MAX_CHANGES = 60
+LIST_DIFF_MAX_ROWS = 2000
+# 效能記錄：開啟時記錄掃描、搜尋、更新列表與執行腳本各階段的耗時，
+# 關閉記錄或關閉視窗時寫入 PROFILE_DIRECTORY（trace 檔可用 chrome://tracing 或 Perfetto 開啟）
+PROFILING_KEY = "com.YinTzuYuan.ScriptFinder.profiling"
+PROFILE_DIRECTORY = os.path.join(CACHE_DIRECTORY, 'profiles')
+MAX_PROFILE_EVENTS = 200000  # 最多保留的計時事件數量，超過時只累計次數
+SLOWEST_FILES_COUNT = 20     # 摘要中列出的最慢檔案數量
+# 詳細訊息（逐一輸出處理的資料夾與檔案）與效能記錄分開：輸出到 Macro 面板本身很慢，會讓記錄到的耗時失真
+VERBOSE_LOG_KEY = "com.YinTzuYuan.ScriptFinder.verboseLog"
+# 執行記錄：每次執行腳本都附加一行到 RUN_HISTORY_PATH，用來把常用、最近用過的腳本排在前面
+RUN_HISTORY_PATH = os.path.join(CACHE_DIRECTORY, 'run_history.jsonl')
+FRECENCY_HALF_LIFE = 7 * 24 * 60 * 60  # 執行次數的權重每隔多久減半（秒）
+FRECENCY_BOOST = 150                    # 排序分數最多加多少（只調整 ScriptSearchIndex 同一層級內的順序）
+RUN_HISTORY_COMPACT_LINES = 500         # 記錄檔超過這個行數且大多為重複的腳本時壓縮
+FRECENCY_REFRESH_INTERVAL = 60          # 排序加分重新計算的間隔（秒），期間搜尋共用同一份加分
+# 搜尋程式碼：開啟後會讀取所有腳本的完整內容，建立以識別字與中文二元組為單位的索引並保存在 BODY_INDEX_PATH
+BODY_SEARCH_KEY = "com.YinTzuYuan.ScriptFinder.bodySearch"
+BODY_INDEX_PATH = os.path.join(CACHE_DIRECTORY, 'body_index.bin')
+BODY_WORD_PATTERN = re.compile(r'\w+')
+# 與 is_cjk 相同的字元範圍；以括號分組，re.split 時會保留切出的中文片段
+BODY_CJK_RUN_PATTERN = re.compile('([\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef\U00020000-\U0003134f]+)')
+# 識別字中的分詞位置（小寫或數字後的大寫、底線後），從這些位置開始的後段也會加入索引
+BODY_SUBWORD_PATTERN = re.compile(r'(?<=[a-z0-9])(?=[A-Z])|(?<=_)(?=[^_])')
+BODY_TOKEN_MIN_LENGTH = 2
+BODY_TOKEN_MAX_LENGTH = 64
+BODY_PREFIX_MIN_LENGTH = 3       # 查詢的字詞至少這麼長時，也比對以它開頭的識別字
+BODY_MAX_LINES_PER_TOKEN = 20    # 每個檔案的每個識別字最多記錄的行號數量
+BODY_MAX_DETAIL_LINES = 10       # 詳細資訊中最多顯示的符合行數
 
-        # 左側腳本列表（寬度會自動調整）
-        self.w.scriptList = vanilla.List((10, 40, -210, -10), [], selectionCallback=self.show_script_details)
 
-        # 右側詳細資訊（固定寬度）
-        self.w.detailsBox = vanilla.TextEditor((-200, 40, -10, -40), "", readOnly=True)
+def normalize_search_text(text):
+    """搜尋用的正規化：NFKC（全形英數轉半形等）後轉小寫，內容不變時沿用原字串"""
+    normalized = unicodedata.normalize('NFKC', text).lower()
+    return text if normalized == text else normalized
 
-        # 執行按鈕
-        self.w.runButton = vanilla.Button((-200, -30, -10, 20), "執行腳本", callback=self.run_script)
-        self.w.runButton.enable(False)  # 初始時停用按鈕
 
-        # 添加重新整理按鈕
-        self.w.reloadButton = vanilla.Button((-50, 10, -10, 20), "↺", callback=self.reload_scripts)
+class TimingSpan:
+    """ScriptProfiler.span 返回的計時區段，離開 with 區塊時記錄耗時"""
+    __slots__ = ('profiler', 'name', 'args', 'start')
 
-        # 設定字體
-        self.w.detailsBox.getNSTextView().setFont_(NSFont.systemFontOfSize_(12))
+    def __init__(self, profiler, name, args):
+        self.profiler = profiler
+        self.name = name
+        self.args = args
+        self.start = 0
 
-        # 初始化列表
-        self.update_script_list(self.scripts_info)
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
 
-        self.w.open()
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.profiler.add_event(self.name, self.start, time.perf_counter_ns() - self.start, self.args)
+        return False
 
-    def get_scripts_info(self):
-        """取得腳本資訊"""
-        directory_path = os.path.expanduser('~/Library/Application Support/Glyphs 3/Scripts')
-        scripts_info = self.read_py_files_in_directory(directory_path)
 
-        # 從結果中移除工具自身的腳本
-        scripts_info = [script for script in scripts_info if script['script_name'] != "腳本搜尋器..."]
+class ScriptProfiler:
+    """
+    結構化的效能記錄
+    以具名的計時區段（span）記錄各階段的耗時，並以計數器記錄走到較慢路徑的次數與檔案；
+    關閉時 span 返回共用的空 context manager，幾乎沒有額外負擔。可輸出摘要 JSON 或 Chrome trace
+    """
+    NULL_SPAN = contextlib.nullcontext()
 
-        return scripts_info
+    def __init__(self, enabled=False, verbose=False):
+        self.lock = threading.Lock()
+        self.enabled = enabled
+        self.verbose = verbose
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.origin = time.perf_counter_ns()
+            self.events = []        # (名稱, 開始時間, 耗時, 執行緒編號, 參數)，時間單位為奈秒
+            self.dropped_events = 0
+            self.counters = {}      # 計數器名稱 -> 次數
+            self.slow_paths = {}    # 計數器名稱 -> {檔案路徑: 次數}
+
+    def span(self, name, **args):
+        """計時區段：with profiler.span("walk", author=author_folder): ..."""
+        if not self.enabled:
+            return self.NULL_SPAN
+        return TimingSpan(self, name, args)
+
+    def add_event(self, name, start, duration, args=None):
+        """記錄一個已完成的計時事件（用於無法以 with 包住的區段，例如產生器）"""
+        if not self.enabled:
+            return
+        with self.lock:
+            if len(self.events) < MAX_PROFILE_EVENTS:
+                self.events.append((name, start, duration, threading.get_ident(), args or {}))
+            else:
+                self.dropped_events += 1
+
+    def count(self, name, file_path=None):
+        """累計計數器；指定 file_path 時一併記錄是哪個檔案走到這條路徑"""
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+            if file_path is not None:
+                paths = self.slow_paths.setdefault(name, {})
+                paths[file_path] = paths.get(file_path, 0) + 1
+
+    def log(self, *args, **kwargs):
+        """詳細訊息，只在 verbose 開啟時輸出（與計時記錄無關）"""
+        if self.verbose:
+            print(*args, **kwargs)
+
+    def summary(self):
+        """
+        彙整記錄結果：各區段的次數與耗時、各作者資料夾的耗時、最慢的檔案，以及計數器
+        時間單位為毫秒
+        """
+        with self.lock:
+            events = list(self.events)
+            counters = dict(self.counters)
+            slow_paths = {name: dict(paths) for name, paths in self.slow_paths.items()}
+            dropped_events = self.dropped_events
+
+        spans = {}
+        authors = {}
+        file_durations = []
+        for name, start, duration, thread_id, args in events:
+            milliseconds = duration / 1e6
+            span_summary = spans.setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            span_summary["count"] += 1
+            span_summary["total_ms"] += milliseconds
+            span_summary["max_ms"] = max(span_summary["max_ms"], milliseconds)
+            if "author" in args:
+                author_summary = authors.setdefault(args["author"], {})
+                author_summary[name + "_ms"] = author_summary.get(name + "_ms", 0.0) + milliseconds
+            if "path" in args:
+                file_durations.append((milliseconds, name, args["path"]))
+
+        file_durations.sort(reverse=True)
+        return {
+            "spans": spans,
+            "authors": authors,
+            "slowest_files": [
+                {"path": path, "span": name, "ms": milliseconds}
+                for milliseconds, name, path in file_durations[:SLOWEST_FILES_COUNT]
+            ],
+            "counters": counters,
+            "slow_paths": {
+                name: sorted(paths, key=paths.get, reverse=True) for name, paths in slow_paths.items()
+            },
+            "dropped_events": dropped_events,
+        }
+
+    def chrome_trace(self):
+        """轉換為 Chrome trace 格式（Trace Event Format 的完整事件），時間單位為微秒"""
+        with self.lock:
+            events = list(self.events)
+            origin = self.origin
+        process_id = os.getpid()
+        return {
+            "traceEvents": [
+                {
+                    "name": name, "cat": "ScriptFinder", "ph": "X",
+                    "ts": (start - origin) / 1000, "dur": duration / 1000,
+                    "pid": process_id, "tid": thread_id, "args": args,
+                }
+                for name, start, duration, thread_id, args in events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def dump(self, file_path, chrome_trace=False):
+        """寫入摘要 JSON 或 Chrome trace 檔案"""
+        data = self.chrome_trace() if chrome_trace else self.summary()
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=None if chrome_trace else 2)
+
+    def print_summary(self, limit=10):
+        """在巨集面板中輸出摘要"""
+        summary = self.summary()
+        print("效能記錄摘要：")
+        for name, span_summary in sorted(summary["spans"].items(), key=lambda item: -item[1]["total_ms"]):
+            print(f"  {name}: {span_summary['count']} 次，共 {span_summary['total_ms']:.1f} ms，"
+                  f"最長 {span_summary['max_ms']:.1f} ms")
+        slowest_authors = sorted(summary["authors"].items(), key=lambda item: -sum(item[1].values()))
+        for author, author_summary in slowest_authors[:limit]:
+            timings = "，".join(f"{name} {milliseconds:.1f} ms" for name, milliseconds in author_summary.items())
+            print(f"  作者資料夾 {author}: {timings}")
+        for file_summary in summary["slowest_files"][:limit]:
+            print(f"  {file_summary['span']} {file_summary['ms']:.1f} ms: {file_summary['path']}")
+        for name, count in sorted(summary["counters"].items()):
+            print(f"  {name}: {count}")
+
+
+class ScriptRecord:
+    """
+    單一腳本的資訊
+    使用 __slots__ 減少大量腳本時的記憶體用量；作者名稱會被 intern 共用，
+    搜尋用的正規化欄位在掃描時計算一次
+    """
+    __slots__ = (
+        'author', 'script_name', 'description', 'file_path', 'uses_gui', 'duplicate_paths',
+        'search_author', 'search_script_name', 'search_description',
+    )
+
+    def __init__(self, author, script_name, description, file_path, uses_gui=False):
+        self.author = sys.intern(author)
+        self.script_name = script_name
+        self.description = description
+        self.file_path = file_path
+        self.uses_gui = uses_gui  # 是否使用 vanilla 建立介面
+        self.duplicate_paths = ()  # 內容完全相同的其他副本 ((作者資料夾, 檔案路徑), ...)
+        self.search_author = sys.intern(normalize_search_text(author))
+        self.search_script_name = normalize_search_text(script_name)
+        self.search_description = normalize_search_text(description)
+
+    def __repr__(self):
+        return f"ScriptRecord({self.author!r}, {self.script_name!r}, {self.file_path!r})"
+
+
+class ScriptInfoCache:
+    """
+    腳本資訊的磁碟快取
+    以檔案路徑為鍵，並記錄檔案大小與修改時間；只有新增或變更過的檔案才需要重新讀取
+    另外保存最上層替身的解析結果，以替身本身的 inode 與修改時間判斷是否需要重新解析，
+    以及偵測重複腳本時計算過的內容雜湊
+    """
+    VERSION = 3
+
+    def __init__(self, cache_path):
+        self.cache_path = cache_path
+        self.entries = {}
+        self.aliases = {}  # 替身路徑 -> {"ino", "mtime", "target"}
+        self.dirty = False
+        self.lock = threading.Lock()  # 掃描時會從多個執行緒寫入
+
+    def load(self):
+        """從磁碟載入快取，格式不符時視為空快取"""
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == self.VERSION:
+                self.entries = data.get("entries", {})
+                self.aliases = data.get("aliases", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"讀取腳本快取 {self.cache_path} 時發生錯誤: {str(e)}")
+            self.entries = {}
+            self.aliases = {}
+
+    def lookup(self, file_path, size, mtime):
+        """
+        查詢快取
+        返回 (是否命中, 快取的資訊)；資訊為 None 表示該檔案沒有 MenuTitle
+        """
+        entry = self.entries.get(file_path)
+        if entry and entry["size"] == size and entry["mtime"] == mtime:
+            return True, entry["info"]
+        return False, None
+
+    def store(self, file_path, size, mtime, info):
+        """寫入單一檔案的解析結果"""
+        with self.lock:
+            self.entries[file_path] = {"size": size, "mtime": mtime, "info": info}
+            self.dirty = True
+
+    def lookup_fingerprint(self, file_path, size, mtime):
+        """查詢檔案內容的雜湊，未計算過或檔案已變更時返回 None"""
+        entry = self.entries.get(file_path)
+        if entry and entry["size"] == size and entry["mtime"] == mtime:
+            return entry.get("fingerprint")
+        return None
+
+    def store_fingerprint(self, file_path, size, mtime, fingerprint):
+        """記錄檔案內容的雜湊（只有在已有相同大小與修改時間的項目時才記錄）"""
+        with self.lock:
+            entry = self.entries.get(file_path)
+            if entry and entry["size"] == size and entry["mtime"] == mtime:
+                entry["fingerprint"] = fingerprint
+                self.dirty = True
+
+    def lookup_alias(self, path, ino, mtime):
+        """查詢替身的解析結果，未命中時返回 None"""
+        entry = self.aliases.get(path)
+        if entry and entry["ino"] == ino and entry["mtime"] == mtime:
+            return entry["target"]
+        return None
+
+    def store_alias(self, path, ino, mtime, target):
+        """寫入替身的解析結果"""
+        self.aliases[path] = {"ino": ino, "mtime": mtime, "target": target}
+        self.dirty = True
+
+    def prune_aliases(self, seen_paths):
+        """移除已不存在的最上層項目"""
+        stale_paths = [path for path in self.aliases if path not in seen_paths]
+        for path in stale_paths:
+            del self.aliases[path]
+        if stale_paths:
+            self.dirty = True
+
+    def prune(self, seen_paths):
+        """移除本次掃描中已不存在的檔案"""
+        stale_paths = [path for path in self.entries if path not in seen_paths]
+        for path in stale_paths:
+            del self.entries[path]
+        if stale_paths:
+            self.dirty = True
+
+    def save(self):
+        """以原子方式寫回磁碟（先寫入暫存檔再取代）"""
+        if not self.dirty:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.cache_path), suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"version": self.VERSION, "entries": self.entries, "aliases": self.aliases}, f, ensure_ascii=False)
+            os.replace(temp_path, self.cache_path)
+            self.dirty = False
+        except Exception as e:
+            print(f"寫入腳本快取 {self.cache_path} 時發生錯誤: {str(e)}")
+
+
+class ExclusionRules:
+    """
+    gitignore 風格的排除規則
+    - 以 / 結尾的規則只比對資料夾，以 ! 開頭的規則重新納入先前排除的項目
+    - 開頭或中間含有 / 的規則比對相對於 Scripts 資料夾的路徑，否則比對任何深度的名稱
+    - 支援 *、?、[...] 與 **；後面的規則優先
+    """
+
+    def __init__(self, patterns):
+        self.rules = []  # (正規表示式, 是否重新納入, 是否只比對資料夾, 是否比對完整路徑)
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith('#'):
+                continue
+            negated = pattern.startswith('!')
+            if negated:
+                pattern = pattern[1:]
+            directory_only = pattern.endswith('/')
+            pattern = pattern.rstrip('/')
+            anchored = '/' in pattern
+            pattern = pattern.lstrip('/')
+            if pattern:
+                self.rules.append((self.translate(pattern), negated, directory_only, anchored))
+
+    @staticmethod
+    def translate(pattern):
+        """將 glob 規則轉為正規表示式，* 與 ? 不跨越 /，** 可跨越任意層資料夾"""
+        regex = []
+        i = 0
+        while i < len(pattern):
+            if pattern.startswith('**/', i):
+                regex.append('(?:.*/)?')
+                i += 3
+            elif pattern.startswith('**', i):
+                regex.append('.*')
+                i += 2
+            elif pattern[i] == '*':
+                regex.append('[^/]*')
+                i += 1
+            elif pattern[i] == '?':
+                regex.append('[^/]')
+                i += 1
+            elif pattern[i] == '[' and pattern.find(']', i + 2) != -1:
+                end = pattern.find(']', i + 2)
+                chars = pattern[i + 1:end].replace('\\', '\\\\')
+                if chars.startswith('!'):
+                    chars = '^' + chars[1:]
+                regex.append('[' + chars + ']')
+                i = end + 1
+            else:
+                regex.append(re.escape(pattern[i]))
+                i += 1
+        return re.compile(''.join(regex))
+
+    def is_excluded(self, relative_path, is_dir):
+        """relative_path 為相對於 Scripts 資料夾、以 / 分隔的路徑"""
+        name = relative_path.rsplit('/', 1)[-1]
+        excluded = False
+        for regex, negated, directory_only, anchored in self.rules:
+            if directory_only and not is_dir:
+                continue
+            if regex.fullmatch(relative_path if anchored else name):
+                excluded = not negated
+        return excluded
+
+
+# 增量重新整理的結果：各類檔案數量，以及被移除（含變更前）與新加入（含變更後）的腳本
+RefreshResult = namedtuple('RefreshResult', ['added', 'changed', 'removed', 'removed_scripts', 'added_scripts'])
+
+
+class ScriptCatalog:
+    """
+    腳本目錄的掃描結果
+    保存上一次掃描的檔案快照，重新整理時只處理新增、變更或刪除的檔案
+    """
+
+    def __init__(self, directory, info_cache, max_workers=1, exclude_patterns=DEFAULT_EXCLUDE_PATTERNS,
+                 profiler=None):
+        self.directory = directory
+        self.info_cache = info_cache
+        self.max_workers = max_workers
+        self.exclusion_rules = ExclusionRules(exclude_patterns)
+        self.profiler = profiler or ScriptProfiler()
+        self.snapshot = {}       # (作者資料夾, 檔案路徑) -> (檔案大小, 修改時間)
+        self.infos_by_key = {}   # (作者資料夾, 檔案路徑) -> 腳本資訊，沒有 MenuTitle 的檔案為 None
+        self.folder_mtimes = {}  # 走訪過的資料夾路徑 -> 修改時間，供 ScriptFolderWatcher 比對
+        self.scripts_info = []
+        self.refresh_lock = threading.Lock()  # 同一時間只允許一個重新整理
+
+    def scan(self):
+        """完整掃描腳本目錄"""
+        return self.read_py_files_in_directory(self.directory)
+
+    def refresh(self):
+        """
+        增量重新整理
+        比對新舊快照，只重新解析新增或變更的檔案，並移除已刪除的檔案
+        返回 RefreshResult
+        """
+        with self.refresh_lock, self.profiler.span("refresh"):
+            folder_mtimes = {}
+            with self.profiler.span("snapshot"):
+                snapshot = self.take_snapshot(self.directory, folder_mtimes)
+            added = [key for key in snapshot if key not in self.snapshot]
+            changed = [key for key in snapshot if key in self.snapshot and snapshot[key] != self.snapshot[key]]
+            removed = [key for key in self.snapshot if key not in snapshot]
+
+            for key in removed + changed:
+                self.infos_by_key.pop(key, None)
+            modified = added + changed
+            with self.profiler.span("read", files=len(modified)):
+                script_infos = self.map_concurrently(lambda key: self.read_entry(key, snapshot[key]), modified)
+            self.infos_by_key.update(zip(modified, script_infos))
+
+            # 重複的腳本可能因為其他副本的變動而顯示或隱藏，以新舊清單的差異計算增減
+            previous_scripts = self.scripts_info
+            self.snapshot = snapshot
+            self.folder_mtimes = folder_mtimes
+            self.scripts_info = self.collect_scripts_info()
+            previous_set = set(previous_scripts)
+            current_set = set(self.scripts_info)
+            removed_scripts = [script for script in previous_scripts if script not in current_set]
+            added_scripts = [script for script in self.scripts_info if script not in previous_set]
+            self.save_cache()
+            return RefreshResult(len(added), len(changed), len(removed), removed_scripts, added_scripts)
 
     def read_py_files_in_directory(self, directory):
         """讀取目錄中的 Python 檔案"""
-        py_files_info = []
-        skip_folders = ['fontTools', 'robofab', 'vanilla']
+        for batch in self.iter_scan_batches(directory):
+            pass
+
+        print(f"總共提取了 {len(self.scripts_info)} 個腳本資訊資訊")
+        return self.scripts_info
+
+    def iter_scan_batches(self, directory, batch_size=SCAN_BATCH_SIZE):
+        """
+        完整掃描目錄，並逐批產生掃描到的腳本資訊
+        每完成一個作者資料夾就依序產生該資料夾的腳本（每批最多 batch_size 個），
+        全部完成後才更新快照與快取
+        """
+        self.profiler.log(f"開始讀取目錄: {directory}")
+        # 產生器會在中途交出控制權，整體耗時以開始與結束的時間記錄
+        scan_start = time.perf_counter_ns()
+
+        snapshot = {}
+        infos_by_key = {}
+        folder_mtimes = {}
+        self.record_folder_mtime(directory, folder_mtimes)
+        author_folders = self.list_author_folders(directory)
+        # 每個作者資料夾各自走訪並讀取，結果依原本的資料夾順序合併
+        read_author_folder = lambda author_folder_item: self.read_author_folder(author_folder_item, folder_mtimes)
+        for author_snapshot in self.imap_concurrently(read_author_folder, author_folders):
+            batch = []
+            for key, stat, script_info in author_snapshot:
+                snapshot[key] = stat
+                infos_by_key[key] = script_info
+                if self.is_listed(script_info):
+                    batch.append(script_info)
+            for start in range(0, len(batch), batch_size):
+                yield batch[start:start + batch_size]
+
+        self.snapshot = snapshot
+        self.infos_by_key = infos_by_key
+        self.folder_mtimes = folder_mtimes
+        self.scripts_info = self.collect_scripts_info()
+        with self.profiler.span("save_cache"):
+            self.save_cache()
+        self.profiler.add_event("scan", scan_start, time.perf_counter_ns() - scan_start,
+                                {"files": len(snapshot), "scripts": len(self.scripts_info)})
 
-        self.debug_print(f"開始讀取目錄: {directory}")
+    def list_author_folders(self, directory):
+        """列出最上層的作者資料夾，返回 [(作者資料夾, 解析後的路徑)]"""
+        list_start = time.perf_counter_ns()
+        candidates = []
+        alias_paths = set()
 
         try:
-            items = os.listdir(directory)
-            author_folders = []
-            for item in items:
-                item_path = os.path.join(directory, item)
-                self.debug_print(f"處理項目: {item_path}")
-                resolved_path = self.get_original_path(item_path)
-                self.debug_print(f"解析後的路徑: {resolved_path}")
-                if os.path.isdir(resolved_path) and item not in skip_folders:
-                    author_folders.append((item, resolved_path))
-                    self.debug_print(f"添加作者資料夾: {item} -> {resolved_path}")
-                else:
-                    self.debug_print(f"跳過項目: {item}")
+            with os.scandir(directory) as entries:
+                entries = list(entries)
         except Exception as e:
             print(f"讀取目錄 {directory} 時發生錯誤: {str(e)}")
-            return py_files_info
+            return []
+
+        for entry in entries:
+            item = entry.name
+            self.profiler.log(f"處理項目: {entry.path}")
+            if entry.is_dir(follow_symlinks=False):
+                # 一般資料夾不可能是替身，不需解析
+                resolved_path = entry.path
+            else:
+                alias_paths.add(entry.path)
+                resolved_path = self.resolve_alias(entry.path)
+                self.profiler.log(f"解析後的路徑: {resolved_path}")
+                if not os.path.isdir(resolved_path):
+                    self.profiler.log(f"跳過項目: {item}")
+                    continue
+            if self.exclusion_rules.is_excluded(item, is_dir=True):
+                self.profiler.log(f"跳過項目: {item}")
+                continue
+            candidates.append((item, resolved_path, resolved_path != entry.path))
+        self.info_cache.prune_aliases(alias_paths)
+
+        author_folders = self.deduplicate_author_folders(candidates)
+        self.profiler.log(f"找到的作者資料夾: {[af[0] for af in author_folders]}")
+        self.profiler.add_event("list_roots", list_start, time.perf_counter_ns() - list_start,
+                                {"folders": len(author_folders)})
+        return author_folders
+
+    def resolve_alias(self, path):
+        """解析替身的原始路徑，替身本身的 inode 與修改時間未變時直接使用快取"""
+        try:
+            stat = os.lstat(path)
+        except OSError:
+            return path
 
-        self.debug_print(f"找到的作者資料夾: {[af[0] for af in author_folders]}")
+        target = self.info_cache.lookup_alias(path, stat.st_ino, stat.st_mtime_ns)
+        if target is not None and os.path.exists(target):
+            self.profiler.count("alias_cache_hit")
+            return target
 
-        for author_folder, author_path in author_folders:
-            self.debug_print(f"處理作者資料夾: {author_folder} (路徑: {author_path})")
+        self.profiler.count("alias_resolved", path)
+        with self.profiler.span("resolve_alias", path=path):
+            target = self.get_original_path(path)
+        self.info_cache.store_alias(path, stat.st_ino, stat.st_mtime_ns, target)
+        return target
 
-            if not os.path.exists(author_path):
-                print(f"警告：資料夾不存在 {author_path}")
+    def deduplicate_author_folders(self, candidates):
+        """
+        依實際路徑與 (裝置, inode) 去除重複的作者資料夾，確保每個腳本只被掃描一次
+        同一個資料夾有多個名稱時優先保留非替身的名稱；位於其他作者資料夾之內的資料夾也會略過
+        candidates: [(作者資料夾, 解析後的路徑, 是否為替身)]，返回值維持原本的順序
+        """
+        real_paths = {}  # candidates 的索引 -> 實際路徑
+        seen_identities = set()
+        # 非替身的項目優先（sorted 為穩定排序）
+        for index in sorted(range(len(candidates)), key=lambda i: candidates[i][2]):
+            item, resolved_path, is_alias = candidates[index]
+            real_path = os.path.realpath(resolved_path)
+            try:
+                stat = os.stat(real_path)
+                identity = (stat.st_dev, stat.st_ino)
+            except OSError:
+                identity = real_path
+            if identity in seen_identities or real_path in seen_identities:
+                self.profiler.log(f"跳過重複的作者資料夾: {item} -> {real_path}")
+                continue
+            seen_identities.update((identity, real_path))
+            real_paths[index] = real_path
+
+        author_folders = []
+        for index, (item, resolved_path, is_alias) in enumerate(candidates):
+            real_path = real_paths.get(index)
+            if real_path is None:
+                continue
+            if any(real_path.startswith(other_path.rstrip(os.sep) + os.sep)
+                   for other_index, other_path in real_paths.items() if other_index != index):
+                self.profiler.log(f"跳過位於其他作者資料夾內的資料夾: {item} -> {real_path}")
+                continue
+            author_folders.append((item, resolved_path))
+            self.profiler.log(f"添加作者資料夾: {item} -> {resolved_path}")
+        return author_folders
+
+    def take_snapshot(self, directory, folder_mtimes=None):
+        """走訪所有作者資料夾，只記錄每個 .py 檔案的大小與修改時間，不讀取內容"""
+        snapshot = {}
+        self.record_folder_mtime(directory, folder_mtimes)
+        author_folders = self.list_author_folders(directory)
+        walk_author_folder = lambda author_folder_item: self.walk_author_folder(author_folder_item, folder_mtimes)
+        for author_files in self.map_concurrently(walk_author_folder, author_folders):
+            snapshot.update(author_files)
+        return snapshot
+
+    def record_folder_mtime(self, folder_path, folder_mtimes, mtime=None):
+        """記錄資料夾的修改時間（在讀取資料夾內容之前記錄，之後的變更一定會被偵測到）"""
+        if folder_mtimes is None:
+            return
+        if mtime is None:
+            try:
+                mtime = os.stat(folder_path).st_mtime_ns
+            except OSError:
+                return
+        folder_mtimes[folder_path] = mtime
+
+    def walk_author_folder(self, author_folder_item, folder_mtimes=None):
+        """
+        走訪單一作者資料夾，返回 [((作者資料夾, 檔案路徑), (檔案大小, 修改時間))]
+        folder_mtimes: 傳入 dict 時一併記錄走訪過的資料夾修改時間
+        """
+        author_folder, author_path = author_folder_item
+        self.profiler.log(f"處理作者資料夾: {author_folder} (路徑: {author_path})")
+
+        author_files = []
+        if not os.path.exists(author_path):
+            print(f"警告：資料夾不存在 {author_path}")
+            return author_files
+        self.record_folder_mtime(author_path, folder_mtimes)
+        walk_start = time.perf_counter_ns()
+
+        # 以 os.scandir 由上而下走訪（順序與 os.walk 相同，不進入資料夾的符號連結），
+        # 排除的資料夾整個略過；DirEntry 會快取檔案類型與 stat 結果，每個檔案最多一次系統呼叫
+        pending = [(author_path, author_folder)]  # (資料夾路徑, 相對於 Scripts 資料夾的路徑)
+        while pending:
+            folder_path, relative_folder = pending.pop()
+            try:
+                with os.scandir(folder_path) as entries:
+                    entries = list(entries)
+            except OSError as e:
+                print(f"讀取目錄 {folder_path} 時發生錯誤: {str(e)}")
                 continue
 
-            for root, dirs, files in os.walk(author_path):
-                for file in files:
-                    if file.endswith('.py'):
-                        file_path = os.path.join(root, file)
-                        self.debug_print(f"處理檔案: {file_path}")
-                        try:
-                            with open(file_path, 'r', encoding='utf-8') as f:
-                                content = f.read()
-                                script_info = self.extract_script_info(file_path, content, author_folder)
-                                if script_info:
-                                    script_info["file_path"] = file_path
-                                    py_files_info.append(script_info)
-                                    self.debug_print(f"成功提取腳本資訊: {script_info['script_name']}")
-                                else:
-                                    self.debug_print(f"無法提取腳本資訊: {file_path}")
-                        except Exception as e:
-                            print(f"讀取檔案 {file_path} 時發生錯誤: {str(e)}")
-
-        print(f"總共提取了 {len(py_files_info)} 個腳本資訊資訊")
-        return py_files_info
+            subfolders = []
+            for entry in entries:
+                relative_path = relative_folder + '/' + entry.name
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if self.exclusion_rules.is_excluded(relative_path, is_dir):
+                    self.profiler.log(f"排除: {relative_path}")
+                    continue
+                if is_dir:
+                    if not entry.is_symlink():
+                        subfolders.append((entry.path, relative_path))
+                        if folder_mtimes is not None:
+                            try:
+                                self.record_folder_mtime(entry.path, folder_mtimes, entry.stat().st_mtime_ns)
+                            except OSError:
+                                pass
+                elif entry.name.endswith('.py'):
+                    try:
+                        stat = entry.stat()
+                    except OSError as e:
+                        print(f"讀取檔案 {entry.path} 時發生錯誤: {str(e)}")
+                        continue
+                    author_files.append(((author_folder, entry.path), (stat.st_size, stat.st_mtime_ns)))
+            pending.extend(reversed(subfolders))
+
+        self.profiler.add_event("walk", walk_start, time.perf_counter_ns() - walk_start,
+                                {"author": author_folder, "files": len(author_files)})
+        return author_files
+
+    def read_author_folder(self, author_folder_item, folder_mtimes=None):
+        """走訪並讀取單一作者資料夾，返回 [(鍵, (檔案大小, 修改時間), 腳本資訊)]"""
+        author_files = self.walk_author_folder(author_folder_item, folder_mtimes)
+        with self.profiler.span("read", author=author_folder_item[0], files=len(author_files)):
+            return [(key, stat, self.read_entry(key, stat)) for key, stat in author_files]
+
+    def map_concurrently(self, func, items):
+        """
+        在有限數量的執行緒上執行 func，結果順序與 items 相同
+        max_workers 為 1 或項目不足兩個時直接依序執行
+        """
+        return list(self.imap_concurrently(func, items))
+
+    def imap_concurrently(self, func, items):
+        """map_concurrently 的產生器版本，依 items 的順序逐一產生已完成的結果"""
+        if self.max_workers <= 1 or len(items) <= 1:
+            for item in items:
+                yield func(item)
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            yield from executor.map(func, items)
+
+    def read_entry(self, key, stat):
+        """讀取快照中的單一檔案，發生錯誤時返回 None"""
+        author_folder, file_path = key
+        self.profiler.log(f"處理檔案: {file_path}")
+        try:
+            script_info = self.read_script_info(file_path, author_folder, *stat)
+        except Exception as e:
+            print(f"讀取檔案 {file_path} 時發生錯誤: {str(e)}")
+            self.profiler.count("read_error", file_path)
+            return None
+
+        if script_info:
+            self.profiler.log(f"成功提取腳本資訊: {script_info.script_name}")
+        else:
+            self.profiler.log(f"無法提取腳本資訊: {file_path}")
+        return script_info
+
+    def collect_scripts_info(self):
+        """依快照順序整理腳本資訊，移除工具自身的腳本，並合併內容相同的腳本"""
+        listed = []
+        for key, stat in self.snapshot.items():
+            script = self.infos_by_key.get(key)
+            if self.is_listed(script):
+                listed.append((key, stat, script))
+        with self.profiler.span("deduplicate", scripts=len(listed)):
+            return self.collapse_duplicates(listed)
+
+    def collapse_duplicates(self, listed):
+        """
+        合併內容完全相同的腳本（例如同時以外掛管理員與 git clone 安裝的同一套腳本）
+        先依檔案大小分組，只有大小相同的檔案才計算內容雜湊；內容相同時只保留快照順序中的第一個，
+        其餘副本的位置記錄在它的 duplicate_paths
+        listed: [(鍵, (檔案大小, 修改時間), 腳本資訊)]
+        """
+        sizes = {}
+        for key, (size, mtime), script in listed:
+            sizes[size] = sizes.get(size, 0) + 1
+        colliding = [(key, stat) for key, stat, script in listed if sizes[stat[0]] > 1]
+        fingerprints = dict(zip(
+            [key for key, stat in colliding],
+            self.map_concurrently(lambda item: self.get_fingerprint(*item), colliding)))
+
+        scripts_info = []
+        canonical_scripts = {}  # 內容雜湊 -> 保留的腳本
+        duplicate_paths = {}    # 保留的腳本 -> 其他副本的位置
+        for key, stat, script in listed:
+            fingerprint = fingerprints.get(key)
+            canonical = canonical_scripts.get(fingerprint) if fingerprint else None
+            if canonical is None:
+                if fingerprint:
+                    canonical_scripts[fingerprint] = script
+                scripts_info.append(script)
+            else:
+                self.profiler.log(f"重複的腳本: {script.file_path} -> {canonical.file_path}")
+                duplicate_paths.setdefault(canonical, []).append(key)
+        for script in scripts_info:
+            script.duplicate_paths = tuple(duplicate_paths.get(script, ()))
+        return scripts_info
+
+    def get_fingerprint(self, key, stat):
+        """返回檔案內容的雜湊，檔案未變更時使用快取的結果，讀取失敗時返回 None"""
+        author_folder, file_path = key
+        size, mtime = stat
+        fingerprint = self.info_cache.lookup_fingerprint(file_path, size, mtime)
+        if fingerprint is not None:
+            return fingerprint
+
+        self.profiler.count("fingerprint", file_path)
+        digest = hashlib.sha1()
+        try:
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(FINGERPRINT_CHUNK_SIZE), b''):
+                    digest.update(chunk)
+        except OSError as e:
+            print(f"讀取檔案 {file_path} 時發生錯誤: {str(e)}")
+            return None
+        fingerprint = digest.hexdigest()
+        self.info_cache.store_fingerprint(file_path, size, mtime, fingerprint)
+        return fingerprint
+
+    def is_listed(self, script):
+        """是否顯示在清單中：需有 MenuTitle，且不是工具自身的腳本"""
+        return script is not None and script.script_name != "腳本搜尋器..."
+
+    def save_cache(self):
+        """清除快取中已不存在的檔案並寫回磁碟"""
+        self.info_cache.prune({file_path for author_folder, file_path in self.snapshot})
+        self.info_cache.save()
+
+    def read_script_info(self, file_path, author_folder, size, mtime):
+        """讀取單一腳本的資訊，檔案大小與修改時間未變時直接使用快取"""
+        hit, cached_info = self.info_cache.lookup(file_path, size, mtime)
+        if not hit:
+            self.profiler.count("cache_miss")
+            with self.profiler.span("parse", path=file_path):
+                script_info = self.extract_script_info(file_path, author_folder)
+            cached_info = None
+            if script_info:
+                cached_info = {
+                    "script_name": script_info["script_name"],
+                    "description": script_info["description"],
+                    "uses_gui": script_info["uses_gui"],
+                }
+            self.info_cache.store(file_path, size, mtime, cached_info)
+        else:
+            self.profiler.count("cache_hit")
+            self.profiler.log(f"使用快取: {file_path}")
+
+        if cached_info is None:
+            return None
+        return ScriptRecord(
+            author_folder, cached_info["script_name"], cached_info["description"], file_path, cached_info["uses_gui"])
 
     def get_original_path(self, path, max_depth=5):
         """
@@ -158,114 +928,1533 @@ class ScriptFinderTool:
             print(f"解析替身檔案時發生錯誤 {path}: {str(e)}")
             return path
 
-    def extract_script_info(self, file_path, file_content, author_folder):
-        """從腳本內容中提取資訊"""
+    def extract_script_info(self, file_path, author_folder):
+        """
+        逐行讀取腳本開頭並提取資訊
+        MenuTitle、__doc__ 與 vanilla 匯入都找到後立即停止讀取；
+        讀到第一個頂層 def/class 時仍有未找到的項目，才一次讀入剩餘內容以相同的規則補查
+        """
         author = author_folder
+        script_name = None
+        description = None
+        uses_vanilla = False
+        doc_lines = None  # 正在讀取的多行 __doc__
 
-        menu_title_match = re.search(r'^#\s*MenuTitle:\s*(.+)$', file_content, re.MULTILINE)
-        if menu_title_match:
-            script_name = menu_title_match.group(1).strip()
-        else:
-            # 如果沒有 MenuTitle，則不顯示在清單中
-            return None
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if script_name is None and 'MenuTitle' in line:
+                    menu_title_match = MENU_TITLE_PATTERN.match(line)
+                    if menu_title_match:
+                        script_name = menu_title_match.group(1).strip()
 
-        doc_match = re.search(r'__doc__\s*=\s*"""([\s\S]*?)"""', file_content)
-        description = doc_match.group(1).strip() if doc_match else "無說明"
+                # 檢查是否使用了 vanilla 模組
+                if not uses_vanilla and 'vanilla' in line:
+                    uses_vanilla = VANILLA_IMPORT_PATTERN.match(line) is not None
 
-        # 檢查是否使用了 vanilla 模組
-        def check_vanilla_usage(file_content):
-            import_pattern = r'^(?!#).*import\s+vanilla'
-            from_import_pattern = r'^(?!#).*from\s+vanilla\s+import'
+                if doc_lines is not None:
+                    doc_end = line.find('"""')
+                    if doc_end == -1:
+                        doc_lines.append(line)
+                    else:
+                        doc_lines.append(line[:doc_end])
+                        description = ''.join(doc_lines).strip()
+                        doc_lines = None
+                elif description is None and '__doc__' in line:
+                    doc_start_match = DOC_START_PATTERN.search(line)
+                    if doc_start_match:
+                        doc_body = line[doc_start_match.end():]
+                        doc_end = doc_body.find('"""')
+                        if doc_end == -1:
+                            doc_lines = [doc_body]
+                        else:
+                            description = doc_body[:doc_end].strip()
 
-            uses_vanilla = (
-                re.search(import_pattern, file_content, re.MULTILINE) is not None or
-                re.search(from_import_pattern, file_content, re.MULTILINE) is not None
-            )
+                if script_name is not None and description is not None and uses_vanilla:
+                    break
 
-            return uses_vanilla
+                # 開頭區段結束，剩餘內容改用整段搜尋
+                if doc_lines is None and line.startswith(HEADER_END_PREFIXES):
+                    self.profiler.count("header_fallback", file_path)
+                    remaining_content = line + f.read()
+                    if script_name is None:
+                        menu_title_match = MENU_TITLE_PATTERN.search(remaining_content)
+                        if menu_title_match:
+                            script_name = menu_title_match.group(1).strip()
+                    if script_name is not None:
+                        if description is None:
+                            doc_match = DOC_PATTERN.search(remaining_content)
+                            if doc_match:
+                                description = doc_match.group(1).strip()
+                        if not uses_vanilla and 'vanilla' in remaining_content:
+                            uses_vanilla = VANILLA_IMPORT_PATTERN.search(remaining_content) is not None
+                    break
 
-        uses_vanilla = check_vanilla_usage(file_content)
+        if script_name is None:
+            # 如果沒有 MenuTitle，則不顯示在清單中
+            return None
 
-        # 如果使用了 vanilla,在說明前加上 (GUI) 標記
-        if uses_vanilla:
-            description = "(GUI) " + description
+        if description is None:
+            description = "無說明"
 
         return {
             "author": author,
             "script_name": script_name,
             "description": description,
+            "uses_gui": uses_vanilla,  # 使用了 vanilla 的腳本在詳細資訊中標示 (GUI)，也可以用 gui:yes 篩選
             "file_path": file_path  # 添加文件路徑到返回的字典中
         }
 
-    def search_scripts(self, sender):
-        """搜尋腳本"""
-        query = sender.get().lower()
-        filtered_scripts = [
-            script for script in self.scripts_info
-            if query in script['script_name'].lower() or
-            query in script['author'].lower() or
-            query in script['description'].lower()
+
+class ScriptCodeCache:
+    """
+    已編譯腳本的快取
+    以路徑、檔案大小與修改時間為鍵保存 code 物件；指定 cache_directory 時，
+    也會像 __pycache__ 一樣把 marshal 後的位元碼存到磁碟，下次開啟工具時不必重新編譯
+    """
+    HEADER = struct.Struct('<4sQQ')  # Python 位元碼版本, 檔案大小, 修改時間
+
+    def __init__(self, cache_directory=None):
+        self.cache_directory = cache_directory
+        self.code_objects = {}  # 檔案路徑 -> (檔案大小, 修改時間, code 物件)
+
+    def get_code(self, file_path):
+        """取得腳本的 code 物件，檔案變更後會重新編譯"""
+        stat = os.stat(file_path)
+        size, mtime = stat.st_size, stat.st_mtime_ns
+
+        cached = self.code_objects.get(file_path)
+        if cached and cached[0] == size and cached[1] == mtime:
+            return cached[2]
+
+        code = self.load_bytecode(file_path, size, mtime)
+        if code is None:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                script_content = file.read()
+            code = compile(script_content, file_path, 'exec', dont_inherit=True)
+            self.save_bytecode(file_path, size, mtime, code)
+
+        self.code_objects[file_path] = (size, mtime, code)
+        return code
+
+    def bytecode_path(self, file_path):
+        """位元碼檔案的路徑，以腳本路徑的雜湊命名"""
+        digest = hashlib.sha1(file_path.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_directory, digest + ".bin")
+
+    def load_bytecode(self, file_path, size, mtime):
+        """讀取磁碟上的位元碼，版本、大小或修改時間不符時返回 None"""
+        if not self.cache_directory:
+            return None
+        try:
+            with open(self.bytecode_path(file_path), 'rb') as f:
+                data = f.read()
+            magic, cached_size, cached_mtime = self.HEADER.unpack_from(data)
+            if magic != importlib.util.MAGIC_NUMBER or cached_size != size or cached_mtime != mtime:
+                return None
+            return marshal.loads(data[self.HEADER.size:])
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"讀取位元碼快取時發生錯誤 {file_path}: {str(e)}")
+            return None
+
+    def save_bytecode(self, file_path, size, mtime, code):
+        """以原子方式寫入位元碼"""
+        if not self.cache_directory:
+            return
+        try:
+            os.makedirs(self.cache_directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_directory, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self.HEADER.pack(importlib.util.MAGIC_NUMBER, size, mtime))
+                f.write(marshal.dumps(code))
+            os.replace(temp_path, self.bytecode_path(file_path))
+        except Exception as e:
+            print(f"寫入位元碼快取時發生錯誤 {file_path}: {str(e)}")
+
+
+class RunHistory:
+    """
+    腳本的執行記錄
+    每次執行只在 JSON Lines 檔案最後附加一行 {"path", "time", "duration"}；
+    行數過多時整理成每個腳本一行的彙總記錄 {"path", "count", "last_run", "total_duration", "frecency"}。
+    frecency 是隨時間指數衰減的執行次數：每次執行加 1，每經過 FRECENCY_HALF_LIFE 秒減半
+    """
+
+    def __init__(self, history_path, half_life=FRECENCY_HALF_LIFE):
+        self.history_path = history_path
+        self.half_life = half_life
+        self.entries = {}  # 檔案路徑 -> {"count", "last_run", "total_duration", "frecency"}（frecency 為 last_run 當時的值）
+        self.line_count = 0
+        self.cached_boosts = None  # (計算時間, {檔案路徑: 排序加分})
+        self.lock = threading.Lock()
+
+    def load(self):
+        """讀取記錄檔，格式不符的行會被略過"""
+        self.entries = {}
+        self.line_count = 0
+        self.cached_boosts = None
+        try:
+            with open(self.history_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self.line_count += 1
+                    try:
+                        self.apply(json.loads(line))
+                    except (ValueError, TypeError, KeyError) as e:
+                        print(f"略過無法讀取的執行記錄：{e}")
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"讀取執行記錄時發生錯誤：{e}")
+        self.compact_if_needed()
+
+    def apply(self, record):
+        """套用一行記錄（單次執行或彙總記錄）"""
+        file_path = record["path"]
+        entry = self.entries.get(file_path)
+        if "count" in record:
+            self.entries[file_path] = {
+                "count": int(record["count"]),
+                "last_run": float(record["last_run"]),
+                "total_duration": float(record["total_duration"]),
+                "frecency": float(record["frecency"]),
+            }
+            return
+        run_time = float(record["time"])
+        if entry is None:
+            entry = self.entries[file_path] = {"count": 0, "last_run": run_time, "total_duration": 0.0, "frecency": 0.0}
+        entry["frecency"] = self.decayed(entry["frecency"], run_time - entry["last_run"]) + 1
+        entry["count"] += 1
+        entry["last_run"] = max(entry["last_run"], run_time)
+        entry["total_duration"] += float(record.get("duration", 0.0))
+
+    def decayed(self, frecency, elapsed):
+        return frecency * 0.5 ** (max(elapsed, 0) / self.half_life)
+
+    def record(self, file_path, run_time, duration):
+        """記錄一次執行並附加到記錄檔"""
+        record = {"path": file_path, "time": run_time, "duration": round(duration, 4)}
+        with self.lock:
+            self.apply(record)
+            self.cached_boosts = None
+            try:
+                os.makedirs(os.path.dirname(self.history_path), exist_ok=True)
+                with open(self.history_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self.line_count += 1
+            except Exception as e:
+                print(f"寫入執行記錄時發生錯誤：{e}")
+            self.compact_if_needed()
+
+    def compact_if_needed(self):
+        """行數超過 RUN_HISTORY_COMPACT_LINES 且是腳本數量的兩倍以上時，改寫為每個腳本一行"""
+        if self.line_count <= max(RUN_HISTORY_COMPACT_LINES, 2 * len(self.entries)):
+            return
+        try:
+            directory = os.path.dirname(self.history_path)
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                for file_path, entry in self.entries.items():
+                    f.write(json.dumps(dict(entry, path=file_path), ensure_ascii=False) + "\n")
+            os.replace(temp_path, self.history_path)
+            self.line_count = len(self.entries)
+        except Exception as e:
+            print(f"整理執行記錄時發生錯誤：{e}")
+
+    def get(self, file_path):
+        """返回腳本的執行記錄，沒有執行過時返回 None"""
+        with self.lock:
+            entry = self.entries.get(file_path)
+            return dict(entry) if entry else None
+
+    def boosts(self, now=None):
+        """
+        返回 {檔案路徑: 排序加分}
+        加分隨目前的 frecency 增加，但不超過 FRECENCY_BOOST；
+        FRECENCY_REFRESH_INTERVAL 秒內且沒有新的執行記錄時返回同一個 dict（呼叫端不可修改），
+        讓搜尋索引可以沿用先前的查詢結果
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            if self.cached_boosts is not None and now - self.cached_boosts[0] < FRECENCY_REFRESH_INTERVAL:
+                return self.cached_boosts[1]
+            boosts = {}
+            for file_path, entry in self.entries.items():
+                frecency = self.decayed(entry["frecency"], now - entry["last_run"])
+                boosts[file_path] = FRECENCY_BOOST * frecency / (frecency + 1)
+            self.cached_boosts = (now, boosts)
+            return boosts
+
+
+class ScriptBodyIndex:
+    """
+    腳本內容的全文索引
+    以詞元為單位（不分大小寫）：識別字（英數字與底線）本身與它在大小寫、底線分詞處開始的後段
+    （例如 smartComponentPoleMapping 另有 componentpolemapping、polemapping、mapping），
+    中文則與 extract_ngrams 一樣切成單字與二元組；每個檔案保存 {詞元: [行號]}，
+    記憶體中另外建立 詞元 -> 檔案路徑集合 的倒排索引；
+    以檔案大小與修改時間判斷是否需要重新讀取，並以 marshal 保存到磁碟
+    """
+    VERSION = 2
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.files = {}      # 檔案路徑 -> (檔案大小, 修改時間, {詞元: [行號]})
+        self.postings = {}   # 詞元 -> {檔案路徑}
+        self.vocabulary = None  # 排序後的所有詞元，用於開頭比對，索引變更後重新建立
+        self.loaded = False
+        self.dirty = False
+        self.lock = threading.Lock()
+
+    def load(self):
+        """從磁碟載入索引，格式不符時視為空索引"""
+        self.loaded = True
+        try:
+            with open(self.index_path, 'rb') as f:
+                version, files = marshal.load(f)
+            if version != self.VERSION:
+                return
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"讀取程式碼索引時發生錯誤：{e}")
+            return
+        with self.lock:
+            self.files = files
+            self.postings = {}
+            for file_path, (size, mtime, tokens) in files.items():
+                self.add_postings(file_path, tokens)
+            self.vocabulary = None
+
+    def save(self):
+        """以原子方式寫入磁碟，沒有變更時不寫入"""
+        if not self.dirty:
+            return
+        try:
+            directory = os.path.dirname(self.index_path)
+            os.makedirs(directory, exist_ok=True)
+            with self.lock:
+                data = marshal.dumps((self.VERSION, self.files))
+                self.dirty = False
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self.index_path)
+        except Exception as e:
+            print(f"寫入程式碼索引時發生錯誤：{e}")
+
+    def update(self, file_stats, map_func=map):
+        """
+        依 [(檔案路徑, (檔案大小, 修改時間))] 更新索引：只讀取新增或變更的檔案，並移除不在清單中的檔案
+        map_func: 讀取檔案用的 map（例如 ScriptCatalog.map_concurrently）
+        返回重新讀取的檔案數量
+        """
+        file_stats = dict(file_stats)
+        changed_paths = [
+            file_path for file_path, stat in file_stats.items()
+            if self.files.get(file_path, (None, None))[:2] != tuple(stat)
         ]
-        self.update_script_list(filtered_scripts)
+        removed_paths = [file_path for file_path in self.files if file_path not in file_stats]
+        tokenized = list(map_func(self.tokenize_file, changed_paths))
 
-    def update_script_list(self, scripts):
-        """更新腳本列表"""
-        self.current_scripts = scripts
-        script_names = [script['script_name'] for script in scripts]
+        with self.lock:
+            for file_path in removed_paths + changed_paths:
+                entry = self.files.pop(file_path, None)
+                if entry is not None:
+                    self.remove_postings(file_path, entry[2])
+            for file_path, tokens in zip(changed_paths, tokenized):
+                if tokens is None:
+                    continue
+                size, mtime = file_stats[file_path]
+                self.files[file_path] = (size, mtime, tokens)
+                self.add_postings(file_path, tokens)
+            if removed_paths or changed_paths:
+                self.vocabulary = None
+                self.dirty = True
+        return len(changed_paths)
 
-        self.w.scriptList.set(script_names)
+    def tokenize_file(self, file_path):
+        """讀取檔案並返回 {詞元: [行號]}，讀取失敗時返回 None"""
+        tokens = {}
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                for line_number, line in enumerate(f, 1):
+                    for token in tokenize_body_line(line):
+                        line_numbers = tokens.get(token)
+                        if line_numbers is None:
+                            tokens[token] = [line_number]
+                        elif len(line_numbers) < BODY_MAX_LINES_PER_TOKEN:
+                            line_numbers.append(line_number)
+        except OSError as e:
+            print(f"讀取檔案 {file_path} 時發生錯誤: {str(e)}")
+            return None
+        return tokens
+
+    def add_postings(self, file_path, tokens):
+        postings = self.postings
+        for token in tokens:
+            paths = postings.get(token)
+            if paths is None:
+                postings[token] = {file_path}
+            else:
+                paths.add(file_path)
+
+    def remove_postings(self, file_path, tokens):
+        postings = self.postings
+        for token in tokens:
+            paths = postings.get(token)
+            if paths is not None:
+                paths.discard(file_path)
+                if not paths:
+                    del postings[token]
+
+    def search(self, text):
+        """
+        返回內容包含 text 中所有字詞的檔案 {檔案路徑: [行號]}
+        英數字的字詞比對相同的詞元，字詞夠長時也比對以它開頭的詞元
+        （例如 smartcomponent 與 polemapping 都可找到 smartComponentPoleMapping）；
+        中文字詞切成二元組，同一行必須包含所有二元組（不檢查二元組是否相鄰）
+        """
+        identifiers, cjk_runs = split_body_words(text)
+        words = {word.lower() for word in identifiers} | set(cjk_runs)
+        if not words:
+            return {}
+        with self.lock:
+            if self.vocabulary is None:
+                self.vocabulary = sorted(self.postings)
+            matched_paths = None
+            groups_by_word = []
+            for word in sorted(words, key=len, reverse=True):
+                # 每個字詞由數組詞元組成：每組至少要有一個詞元出現在檔案中
+                if len(word) == 1:
+                    groups = [[word]]
+                elif is_cjk(word[0]):
+                    groups = [[word[i:i + 2]] for i in range(len(word) - 1)]
+                else:
+                    groups = [self.expand_word(word)]
+                for tokens in groups:
+                    paths = set()
+                    for token in tokens:
+                        paths.update(self.postings.get(token, ()))
+                    matched_paths = paths if matched_paths is None else matched_paths & paths
+                    if not matched_paths:
+                        return {}
+                groups_by_word.append(groups)
+
+            hits = {}
+            for file_path in matched_paths:
+                file_tokens = self.files[file_path][2]
+                line_numbers = set()
+                for groups in groups_by_word:
+                    word_lines = None
+                    for tokens in groups:
+                        group_lines = set()
+                        for token in tokens:
+                            group_lines.update(file_tokens.get(token, ()))
+                        word_lines = group_lines if word_lines is None else word_lines & group_lines
+                    if not word_lines:
+                        # 中文字詞的二元組分散在不同行
+                        break
+                    line_numbers |= word_lines
+                else:
+                    hits[file_path] = sorted(line_numbers)
+            return hits
+
+    def expand_word(self, word):
+        """返回與字詞相符的詞元：完全相同，或字詞夠長時以它開頭的詞元"""
+        if len(word) < BODY_PREFIX_MIN_LENGTH:
+            return [word] if word in self.postings else []
+        vocabulary = self.vocabulary
+        tokens = []
+        index = bisect.bisect_left(vocabulary, word)
+        while index < len(vocabulary) and vocabulary[index].startswith(word):
+            tokens.append(vocabulary[index])
+            index += 1
+        return tokens
+
+
+def is_cjk(char):
+    """是否為中日韓文字、標點或全形字元"""
+    return (
+        '\u2e80' <= char <= '\u9fff' or
+        '\uac00' <= char <= '\ud7af' or
+        '\uf900' <= char <= '\ufaff' or
+        '\uff00' <= char <= '\uffef' or
+        '\U00020000' <= char <= '\U0003134f'
+    )
+
+
+def split_body_words(text):
+    """把文字切成 (識別字清單, 中文片段清單)，中文與英數字相連時（例如 路徑path）也會分開"""
+    identifiers = []
+    cjk_runs = []
+    for word in BODY_WORD_PATTERN.findall(text):
+        for index, part in enumerate(BODY_CJK_RUN_PATTERN.split(word)):
+            if index % 2:
+                cjk_runs.append(part)
+            elif BODY_TOKEN_MIN_LENGTH <= len(part) <= BODY_TOKEN_MAX_LENGTH:
+                identifiers.append(part)
+    return identifiers, cjk_runs
+
+
+def cjk_body_grams(run):
+    """中文片段的所有單字與二元組"""
+    grams = set(run)
+    grams.update(run[i:i + 2] for i in range(len(run) - 1))
+    return grams
+
+
+def tokenize_body_line(line):
+    """返回一行程式碼的所有詞元（小寫）：識別字與它從分詞處開始的後段，以及中文的單字與二元組"""
+    identifiers, cjk_runs = split_body_words(line)
+    tokens = set()
+    for identifier in identifiers:
+        tokens.add(identifier.lower())
+        for match in BODY_SUBWORD_PATTERN.finditer(identifier):
+            subword = identifier[match.start():]
+            if len(subword) >= BODY_TOKEN_MIN_LENGTH:
+                tokens.add(subword.lower())
+    for run in cjk_runs:
+        tokens.update(cjk_body_grams(run))
+    return tokens
+
+
+def extract_ngrams(text):
+    """
+    切出文字中的 n-gram：CJK 字元起始取二元組，其他字元起始取三元組，另加上所有單一字元
+    n-gram 的長度只由起始字元決定，因此查詢字串的 n-gram 必定出現在包含它的文字中
+    """
+    grams = set(text)
+    if text.isascii():
+        grams.update(text[i:i + 3] for i in range(len(text) - 2))
+        return grams
+    length = len(text)
+    for i, char in enumerate(text):
+        size = 2 if is_cjk(char) else 3
+        if i + size <= length:
+            grams.add(text[i:i + size])
+    return grams
+
+
+SearchQuery = namedtuple('SearchQuery', ['text', 'filters', 'exclusions', 'gui'])
+
+
+def parse_search_query(query):
+    """
+    解析搜尋語法，返回 SearchQuery
+    text: 一般的搜尋文字，沒有使用語法時與 query 完全相同
+    filters: ((欄位, 值), ...) 必須包含的值；exclusions: ((欄位, 值), ...) 排除的值，欄位為 None 表示任何欄位
+    gui: True/False 只顯示（不顯示）使用 vanilla 的腳本，None 表示不篩選
+    值為空的欄位篩選（例如還沒輸入完的 "author:"）會被忽略；gui 的值可以只輸入開頭，例如 gui:y
+    """
+    text_terms = []
+    filters = []
+    exclusions = []
+    gui = None
+    uses_syntax = False
+    for token in QUERY_TOKEN_PATTERN.findall(query):
+        negated = token.startswith('-') and len(token) > 1
+        term = token[1:] if negated else token
+        field, separator, value = term.partition(':')
+        if separator and (field in QUERY_FIELDS or field == QUERY_GUI_FIELD):
+            uses_syntax = True
+            value = value.replace('"', '')
+            if not value:
+                continue
+            if field == QUERY_GUI_FIELD:
+                if any(true_value.startswith(value) for true_value in QUERY_TRUE_VALUES):
+                    gui = not negated
+                elif any(false_value.startswith(value) for false_value in QUERY_FALSE_VALUES):
+                    gui = negated
+            elif negated:
+                exclusions.append((QUERY_FIELDS[field], value))
+            else:
+                filters.append((QUERY_FIELDS[field], value))
+        elif negated:
+            uses_syntax = True
+            term = term.replace('"', '')
+            if term:
+                exclusions.append((None, term))
+        else:
+            text_terms.append(term)
+
+    if not uses_syntax:
+        return SearchQuery(query, (), (), None)
+    text = ' '.join(term.replace('"', '') for term in text_terms)
+    return SearchQuery(text, tuple(filters), tuple(exclusions), gui)
+
+
+QueryResult = namedtuple('QueryResult', ['query', 'filters', 'candidate_ids', 'limit', 'boosts', 'results'])
+
+
+class ScriptSearchIndex:
+    """
+    腳本搜尋用的 n-gram 倒排索引
+    每次掃描後建立一次，之後以 update 增量更新；查詢時先交集各 n-gram 的清單，
+    再以子字串比對確認候選結果，結果與逐一比對 ScriptRecord 正規化欄位的子字串搜尋相同
+    rank 會保留最近幾次查詢的結果：新的查詢包含上一次的查詢時（例如 "sma" 之後輸入 "smar"），
+    只在上一次可能符合的腳本中搜尋；刪除字元回到先前的查詢時直接返回保留的結果
+    欄位篩選與排除（見 parse_search_query）以各欄位的 n-gram 索引與 GUI 欄位的集合計算，
+    得到的腳本編號集合再限制一般文字的搜尋範圍
+    """
+    FIELDS = ('script_name', 'author', 'description')
+    VERIFY_THRESHOLD = 64  # 候選數量低於此值時不再交集，直接逐一比對
+    QUERY_STACK_SIZE = 16  # 保留的查詢結果數量
+
+    # 排序分數：名稱符合優先於作者，作者優先於說明
+    SCORE_NAME_EXACT = 1000
+    SCORE_NAME_PREFIX = 900
+    SCORE_NAME_WORD = 700
+    SCORE_NAME_SUBSTRING = 500
+    SCORE_NAME_SUBSEQUENCE = 300
+    SCORE_AUTHOR = 200
+    SCORE_DESCRIPTION = 100
+
+    @classmethod
+    def score_tier(cls, score):
+        """
+        分數所屬的層級，數字越小越優先；加分只調整同一層級內的順序，不會讓腳本越過較高的層級
+        名稱的各種符合方式各自一層，模糊比對的分數依字元間距而不同，但同屬一層
+        """
+        if cls.SCORE_AUTHOR < score <= cls.SCORE_NAME_SUBSEQUENCE:
+            return -cls.SCORE_NAME_SUBSEQUENCE
+        return -score
+
+    def __init__(self, scripts=()):
+        self.lock = threading.Lock()  # 背景掃描或更新時，避免與背景搜尋同時存取
+        self.reset()
+        self.add(scripts)
+
+    def reset(self):
+        self.scripts = []          # 腳本編號 -> 腳本（包含已失效的項目）
+        self.ordered_scripts = []  # 依掃描順序排列的有效腳本
+        self.positions = []        # 腳本編號 -> 在掃描順序中的位置，同分時以此排序
+        self.ids_by_script = {}    # 腳本 -> 腳本編號
+        self.ids_by_path = {}      # 檔案路徑 -> 腳本編號，用於執行記錄的加分
+        self.removed_ids = set()   # 已失效的腳本編號
+        self.gui_ids = set()       # 使用 vanilla 的腳本編號（gui:yes 篩選）
+        self.columns = {field: [] for field in self.FIELDS}    # 欄位 -> 各腳本的正規化文字
+        self.postings = {field: {} for field in self.FIELDS}   # 欄位 -> n-gram -> 腳本編號清單（遞增）
+        self.query_stack = []      # 最近的 QueryResult，每一個的查詢都包含前一個的查詢
+
+    def add(self, scripts):
+        """依掃描順序在最後加入腳本並更新索引"""
+        with self.lock:
+            self.add_unlocked(scripts)
+            self.ordered_scripts.extend(scripts)
+
+    def update(self, removed_scripts, added_scripts, ordered_scripts):
+        """
+        增量更新索引
+        移除的腳本只標記為失效，新增的腳本附加在索引最後，再依 ordered_scripts（新的掃描順序）
+        重新計算排序位置；失效項目超過一半時整個重建
+        """
+        with self.lock:
+            for script in removed_scripts:
+                script_id = self.ids_by_script.pop(script, None)
+                if script_id is not None:
+                    self.removed_ids.add(script_id)
+                    if self.ids_by_path.get(script.file_path) == script_id:
+                        del self.ids_by_path[script.file_path]
+
+            self.query_stack = []
+            if len(self.removed_ids) * 2 > len(self.scripts):
+                self.reset()
+                self.add_unlocked(ordered_scripts)
+            else:
+                self.add_unlocked(added_scripts)
+                position_of = {script: position for position, script in enumerate(ordered_scripts)}
+                self.positions = [position_of.get(script, -1) for script in self.scripts]
+            self.ordered_scripts = list(ordered_scripts)
+
+    def add_unlocked(self, scripts):
+        """加入腳本，排序位置接在目前的 ordered_scripts 之後"""
+        self.query_stack = []
+        first_position = len(self.ordered_scripts)
+        for offset, script in enumerate(scripts):
+            script_id = len(self.scripts)
+            self.scripts.append(script)
+            self.positions.append(first_position + offset)
+            self.ids_by_script[script] = script_id
+            self.ids_by_path[script.file_path] = script_id
+            if script.uses_gui:
+                self.gui_ids.add(script_id)
+            for field in self.FIELDS:
+                text = getattr(script, 'search_' + field)
+                self.columns[field].append(text)
+                postings = self.postings[field]
+                for gram in extract_ngrams(text):
+                    posting = postings.get(gram)
+                    if posting is None:
+                        postings[gram] = [script_id]
+                    else:
+                        posting.append(script_id)
+
+    def search(self, query):
+        """返回名稱、作者或說明包含 query 的腳本，順序與掃描順序相同"""
+        with self.lock:
+            return self.search_unlocked(normalize_search_text(query))
+
+    def search_unlocked(self, query):
+        if not query:
+            return list(self.ordered_scripts)
+
+        query_grams = extract_ngrams(query)
+        matched_ids = set()
+        for field in self.FIELDS:
+            column = self.columns[field]
+            candidates = self.find_candidates(self.postings[field], query_grams)
+            matched_ids.update(
+                script_id for script_id in candidates
+                if script_id not in matched_ids and query in column[script_id]
+            )
+        positions = self.positions
+        return [self.scripts[script_id] for script_id in sorted(matched_ids, key=positions.__getitem__)]
+
+    def rank(self, query, limit=MAX_SEARCH_RESULTS, is_cancelled=None, boosts=None):
+        """
+        依相關程度排序搜尋結果，只保留分數最高的 limit 個
+        名稱以 query 開頭、在字詞開頭出現、包含 query、依序包含 query 的所有字元，
+        分數依次遞減；同分時維持掃描順序
+        is_cancelled: 每個階段之間呼叫，返回 True 時中止搜尋並返回 None
+        boosts: {檔案路徑: 加分}（例如執行記錄的 frecency），空白查詢時依加分排序全部腳本
+        query 可以使用欄位篩選與排除的語法，只有篩選時依空白查詢的順序返回符合的腳本
+        """
+        search_query = parse_search_query(normalize_search_text(query))
+        query = search_query.text
+        filters = search_query[1:]
+        with self.lock:
+            boosts_by_id = {}
+            for file_path, boost in (boosts or {}).items():
+                script_id = self.ids_by_path.get(file_path)
+                if script_id is not None and script_id not in self.removed_ids:
+                    boosts_by_id[script_id] = boost
+            allowed_ids = self.filter_ids(search_query)
+
+            if not query:
+                return self.list_scripts(boosts_by_id, allowed_ids)
+
+            base = self.find_query_base(query, filters)
+            if base is not None and base.query == query and base.limit == limit and base.boosts is boosts:
+                return list(base.results)
+
+            candidate_ids = base.candidate_ids if base is not None else allowed_ids
+            scored = self.score_candidates(query, limit, is_cancelled or (lambda: False), candidate_ids)
+            if scored is None:
+                return None
+            scores, candidate_ids = scored
+            positions = self.positions
+            score_tier = self.score_tier
+            top_matches = heapq.nsmallest(
+                limit, ((score_tier(score), -(score + boosts_by_id.get(script_id, 0)), positions[script_id], script_id)
+                        for script_id, score in scores.items()))
+            results = [self.scripts[script_id] for _, _, _, script_id in top_matches]
+            self.push_query(QueryResult(query, filters, candidate_ids, limit, boosts, results))
+            return list(results)
+
+    def rank_paths(self, query, scores_by_path, limit=MAX_SEARCH_RESULTS):
+        """
+        依 {檔案路徑: 分數}（例如程式碼搜尋的符合行數）排序腳本，同分時維持掃描順序
+        query 中的欄位篩選與排除同樣適用，其中的一般文字不使用
+        """
+        search_query = parse_search_query(normalize_search_text(query))
+        with self.lock:
+            allowed_ids = self.filter_ids(search_query)
+            positions = self.positions
+            matches = []
+            for file_path, score in scores_by_path.items():
+                script_id = self.ids_by_path.get(file_path)
+                if script_id is None or script_id in self.removed_ids:
+                    continue
+                if allowed_ids is None or script_id in allowed_ids:
+                    matches.append((-score, positions[script_id], script_id))
+            return [self.scripts[script_id] for _, _, script_id in heapq.nsmallest(limit, matches)]
+
+    def list_scripts(self, boosts_by_id, allowed_ids=None):
+        """空白查詢的結果：有加分的腳本依加分排在前面，其餘依掃描順序；allowed_ids 指定時只保留其中的腳本"""
+        if not boosts_by_id and allowed_ids is None:
+            return list(self.ordered_scripts)
+        positions = self.positions
+        boosted_ids = sorted(
+            (script_id for script_id in boosts_by_id if allowed_ids is None or script_id in allowed_ids),
+            key=lambda script_id: (-boosts_by_id[script_id], positions[script_id]))
+        scripts = [self.scripts[script_id] for script_id in boosted_ids]
+        boosted_set = set(scripts)
+        ids_by_script = self.ids_by_script
+        scripts.extend(
+            script for script in self.ordered_scripts
+            if script not in boosted_set and (allowed_ids is None or ids_by_script[script] in allowed_ids))
+        return scripts
+
+    def filter_ids(self, search_query):
+        """
+        計算欄位篩選、GUI 篩選與排除後剩下的腳本編號，沒有任何篩選時返回 None
+        每個篩選都是一次 n-gram 交集加上子字串確認，再以集合運算合併
+        """
+        if not search_query.filters and not search_query.exclusions and search_query.gui is None:
+            return None
+
+        allowed_ids = None
+        for field, value in search_query.filters:
+            matched_ids = self.match_field(field, value)
+            allowed_ids = matched_ids if allowed_ids is None else allowed_ids & matched_ids
+        if search_query.gui is not None:
+            if search_query.gui:
+                allowed_ids = self.gui_ids - self.removed_ids if allowed_ids is None else allowed_ids & self.gui_ids
+            else:
+                allowed_ids = (self.valid_ids() if allowed_ids is None else allowed_ids) - self.gui_ids
+        if allowed_ids is None:
+            allowed_ids = self.valid_ids()
+        for field, value in search_query.exclusions:
+            for excluded_field in (field,) if field else self.FIELDS:
+                if not allowed_ids:
+                    return allowed_ids
+                allowed_ids -= self.match_field(excluded_field, value, allowed_ids)
+        return allowed_ids
+
+    def match_field(self, field, value, within=None):
+        """返回欄位包含 value 的腳本編號集合"""
+        column = self.columns[field]
+        return {
+            script_id for script_id in self.find_candidates(self.postings[field], extract_ngrams(value), within)
+            if value in column[script_id]
+        }
+
+    def valid_ids(self):
+        """所有有效的腳本編號"""
+        return set(range(len(self.scripts))) - self.removed_ids
+
+    def find_query_base(self, query, filters):
+        """
+        移除不是 query 一部分（或篩選條件不同）的查詢結果，返回最後一個（最接近 query 的）查詢結果，沒有時返回 None
+        query 包含先前的查詢時，符合 query 的腳本一定也符合先前的查詢（名稱的模糊比對也是如此）；
+        篩選或排除的條件改變時（例如把 -k 延長為 -ke），符合的腳本可能變多，不能沿用
+        """
+        while self.query_stack and (
+                self.query_stack[-1].filters != filters or self.query_stack[-1].query not in query):
+            self.query_stack.pop()
+        return self.query_stack[-1] if self.query_stack else None
+
+    def push_query(self, query_result):
+        if (self.query_stack and self.query_stack[-1].query == query_result.query and
+                self.query_stack[-1].filters == query_result.filters):
+            self.query_stack.pop()
+        self.query_stack.append(query_result)
+        del self.query_stack[:-self.QUERY_STACK_SIZE]
+
+    def score_candidates(self, query, limit, is_cancelled, within=None):
+        """
+        計算符合的腳本分數（不含加分），返回 ({腳本編號: 分數}, 可能符合的腳本編號)，搜尋被取消時返回 None
+        各層級依分數由高到低計算，較高層級已有 limit 個結果時，較低層級不可能進入前 limit 名（加分不會越過層級），
+        略過不比對；可能符合的腳本編號包含所有符合的腳本與略過的候選，供延伸的查詢縮小範圍
+        within: 只需考慮的腳本編號（先前查詢可能符合的腳本），None 表示全部
+        """
+        query_grams = extract_ngrams(query)
+        name_postings = self.postings['script_name']
+        names = self.columns['script_name']
+        scores = {}
+        unverified_ids = set()
+
+        for script_id in self.find_candidates(name_postings, query_grams, within):
+            position = names[script_id].find(query)
+            if position != -1:
+                scores[script_id] = self.score_name_match(script_id, query, position)
+
+        if is_cancelled():
+            return None
+
+        # 模糊比對：名稱依序包含 query 的每個字元，字元間距越大分數越低
+        if len(query) > 1:
+            subsequence_pattern = re.compile('.*?'.join(map(re.escape, query)), re.DOTALL)
+            candidates = self.find_candidates(name_postings, set(query), within)
+            if len(scores) >= limit:
+                unverified_ids.update(candidates)
+                candidates = ()
+            for script_id in candidates:
+                if script_id in scores:
+                    continue
+                match = subsequence_pattern.search(names[script_id])
+                if match:
+                    gaps = match.end() - match.start() - len(query)
+                    scores[script_id] = self.SCORE_NAME_SUBSEQUENCE - min(gaps, 99)
+
+        for field, field_score in (('author', self.SCORE_AUTHOR), ('description', self.SCORE_DESCRIPTION)):
+            if is_cancelled():
+                return None
+            column = self.columns[field]
+            candidates = self.find_candidates(self.postings[field], query_grams, within)
+            if len(scores) >= limit:
+                unverified_ids.update(candidates)
+                candidates = ()
+            for script_id in candidates:
+                if scores.get(script_id, 0) < field_score and query in column[script_id]:
+                    scores[script_id] = field_score
+
+        unverified_ids.update(scores)
+        return scores, unverified_ids
+
+    def score_name_match(self, script_id, query, position):
+        """名稱包含 query 時的分數"""
+        name = self.columns['script_name'][script_id]
+        if name == query:
+            return self.SCORE_NAME_EXACT
+        if position == 0:
+            return self.SCORE_NAME_PREFIX
+
+        original_name = self.scripts[script_id].script_name
+        while position != -1:
+            previous_char = name[position - 1]
+            if not previous_char.isalnum():
+                return self.SCORE_NAME_WORD
+            # 駝峰式命名的字詞開頭，例如 SmartBBox 的 BBox
+            if (len(original_name) == len(name) and
+                    original_name[position].isupper() and original_name[position - 1].islower()):
+                return self.SCORE_NAME_WORD
+            position = name.find(query, position + 1)
+        return self.SCORE_NAME_SUBSTRING
+
+    def find_candidates(self, postings, query_grams, within=None):
+        """
+        由短到長交集 n-gram 清單，返回候選的腳本編號（不含已失效的項目）
+        within: 指定時只返回其中的腳本編號
+        """
+        posting_lists = [] if within is None else [within]
+        for gram in query_grams:
+            posting = postings.get(gram)
+            if posting is None:
+                return ()
+            posting_lists.append(posting)
+        posting_lists.sort(key=len)
+
+        candidates = set(posting_lists[0])
+        for posting in posting_lists[1:]:
+            if len(candidates) <= self.VERIFY_THRESHOLD:
+                break
+            candidates.intersection_update(posting)
+        if within is not None and posting_lists[0] is not within:
+            candidates.intersection_update(within)
+        candidates.difference_update(self.removed_ids)
+        return candidates
+
+
+class ScriptFolderWatcher:
+    """
+    以輪詢方式監看腳本資料夾，偵測到變更時呼叫 on_change（在背景執行緒中）
+    每次只比對資料夾的修改時間（新增、刪除或更名檔案時會改變）；
+    每 full_check_every 次再比對一次所有 .py 檔案的大小與修改時間，以偵測原地儲存的修改
+    """
+
+    def __init__(self, catalog, on_change, interval=WATCH_INTERVAL, full_check_every=WATCH_FULL_CHECK_EVERY):
+        self.catalog = catalog
+        self.on_change = on_change
+        self.interval = interval
+        self.full_check_every = full_check_every
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self):
+        poll_count = 0
+        while not self.stop_event.wait(self.interval):
+            poll_count += 1
+            try:
+                if self.has_changes(full_check=poll_count % self.full_check_every == 0):
+                    self.on_change()
+            except Exception as e:
+                print(f"監看腳本資料夾時發生錯誤：{e}")
+                traceback.print_exc()
+
+    def has_changes(self, full_check=False):
+        """比對目錄快照中的資料夾（及所有檔案）是否有變更"""
+        for folder_path, mtime in list(self.catalog.folder_mtimes.items()):
+            try:
+                if os.stat(folder_path).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+
+        if full_check:
+            for (author_folder, file_path), stat in list(self.catalog.snapshot.items()):
+                try:
+                    current_stat = os.stat(file_path)
+                except OSError:
+                    return True
+                if (current_stat.st_size, current_stat.st_mtime_ns) != stat:
+                    return True
+        return False
+
+
+class ScriptFinderTool:
+    def __init__(self):
+        # 效能記錄；詳細的掃描訊息（原本的調試模式）另外由 VERBOSE_LOG_KEY 控制
+        self.profiler = ScriptProfiler(enabled=bool(Glyphs.defaults[PROFILING_KEY]),
+                                       verbose=bool(Glyphs.defaults[VERBOSE_LOG_KEY]))
+
+        # 根據 Glyphs 版本獲取 GSScriptingHandler
+        if int(Glyphs.versionNumber) == 3:
+            self.GSScriptingHandler = objc.lookUpClass("GSScriptingHandler")
+        else:
+            self.GSScriptingHandler = objc.lookUpClass("GSMenu")
+
+        # 載入腳本資訊快取
+        self.info_cache = ScriptInfoCache(os.path.join(CACHE_DIRECTORY, "scripts_info.json"))
+        self.info_cache.load()
+        self.catalog = ScriptCatalog(
+            SCRIPTS_DIRECTORY, self.info_cache,
+            max_workers=self.get_scan_workers(), exclude_patterns=self.get_exclude_patterns(),
+            profiler=self.profiler)
+
+        # 腳本資訊與搜尋索引，開啟視窗後在背景掃描並逐批加入
+        self.scripts_info = []
+        self.search_index = ScriptSearchIndex()
+        self.scanning = False
+        self.refresh_lock = threading.Lock()  # 手動與自動重新整理不可同時進行
+
+        # 自動更新用的資料夾監看器
+        self.watcher = ScriptFolderWatcher(self.catalog, self.refresh_scripts)
+
+        # 已編譯腳本的快取
+        self.code_cache = ScriptCodeCache(os.path.join(CACHE_DIRECTORY, "bytecode"))
+
+        # 程式碼搜尋的索引，開啟搜尋程式碼時才在背景載入與更新
+        self.body_index = ScriptBodyIndex(BODY_INDEX_PATH)
+        self.body_index_lock = threading.Lock()
+        self.body_search = bool(Glyphs.defaults[BODY_SEARCH_KEY])  # 背景執行緒讀取這個值，不直接讀取勾選框
+        self.body_hits = {}  # 目前結果中每個腳本符合的行號
+
+        # 執行記錄，常用與最近執行的腳本排在前面
+        self.run_history = RunHistory(RUN_HISTORY_PATH)
+        self.run_history.load()
+        self.selected_script_path = None
+        # 選取是否由使用者（點選或方向鍵）決定；自動選取的第一列在下一次搜尋時不保留
+        self.user_selected = False
+        self.auto_selecting = False
+
+        # 列表目前顯示的內容：每列的 (檔案路徑, 名稱)，以及顯示的腳本數量
+        self.current_scripts = []
+        self.list_keys = []
+        self.visible_count = 0
+        self.updating_list = False  # 套用差異時列表的選取會暫時改變，此時不更新詳細資訊
+        self.details_script = None  # 詳細資訊目前顯示的腳本
+
+        # 背景搜尋的狀態：每次輸入都會遞增 search_generation，較舊的搜尋結果會被捨棄
+        self.search_generation = 0
+        self.applied_generation = 0  # 列表目前顯示的是哪一次查詢的結果
+        self.search_timer = None
+        self.search_due = 0.0        # 排定的搜尋何時執行（time.monotonic），之前表示還有搜尋在等待
+        self.last_scan_search = 0.0  # 掃描中上一次更新列表的時間
+        self.search_lock = threading.Lock()
+        self.closed = False  # 視窗關閉後背景工作排定的介面更新都不再執行
+
+        # 設定初始大小和最小大小
+        initial_width = 600
+        initial_height = 400
+        min_width = 400
+        min_height = 300
+
+        # 建立 GUI
+        self.w = vanilla.Window((initial_width, initial_height), "腳本搜尋器", minSize=(min_width, min_height))
+
+        # 搜尋欄
+        self.w.searchBox = vanilla.SearchBox((10, 10, -60, 20), placeholder="搜尋腳本...", callback=self.search_scripts)
+        self.w.searchBox.getNSSearchField().setToolTip_(
+            "可用 author:作者 name:名稱 desc:說明 gui:yes/no 篩選，-字詞 排除；值有空格時以雙引號包住")
+
+        # 搜尋欄下方的選項列
+        # 搜尋程式碼選項
+        self.w.bodySearchCheckBox = vanilla.CheckBox(
+            (10, 36, 90, 18), "搜尋程式碼", value=self.body_search,
+            sizeStyle="small", callback=self.toggle_body_search)
+        self.w.bodySearchCheckBox.getNSButton().setToolTip_(
+            "在腳本內容中搜尋：英數字比對識別字的開頭或其中以大小寫、底線分開的部分，中文可搜尋任意字詞")
+
+        # 自動更新選項
+        self.w.watchCheckBox = vanilla.CheckBox(
+            (105, 36, 80, 18), "自動更新", value=bool(Glyphs.defaults[WATCH_SCRIPTS_KEY]),
+            sizeStyle="small", callback=self.toggle_watch)
+
+        # 效能記錄選項
+        self.w.profileCheckBox = vanilla.CheckBox(
+            (190, 36, 80, 18), "效能記錄", value=self.profiler.enabled,
+            sizeStyle="small", callback=self.toggle_profiling)
+
+        # 左側腳本列表（寬度會自動調整）
+        self.w.scriptList = vanilla.List((10, 60, -210, -32), [], selectionCallback=self.show_script_details)
+
+        # 掃描進度
+        self.w.scanSpinner = vanilla.ProgressSpinner((10, -25, 16, 16), displayWhenStopped=False, sizeStyle="small")
+        self.w.statusText = vanilla.TextBox((32, -25, -210, 17), "", sizeStyle="small")
+
+        # 右側詳細資訊（固定寬度）
+        self.w.detailsBox = vanilla.TextEditor((-200, 60, -10, -40), "", readOnly=True)
+
+        # 執行按鈕
+        self.w.runButton = vanilla.Button((-200, -30, -10, 20), "執行腳本", callback=self.run_script)
+        self.w.runButton.enable(False)  # 初始時停用按鈕
+        # 在搜尋欄輸入後直接按 Enter 即可執行選中的腳本
+        self.w.setDefaultButton(self.w.runButton)
+
+        # 添加重新整理按鈕
+        self.w.reloadButton = vanilla.Button((-50, 10, -10, 20), "↺", callback=self.reload_scripts)
+
+        # 設定字體
+        self.w.detailsBox.getNSTextView().setFont_(NSFont.systemFontOfSize_(12))
+
+        # 初始化列表
+        self.update_script_list(self.scripts_info)
+
+        # 關閉視窗時停止背景工作
+        self.w.bind("close", self.window_closed)
+
+        # 先開啟視窗並聚焦搜尋欄，再開始背景掃描
+        self.w.open()
+        self.w.getNSWindow().makeFirstResponder_(self.w.searchBox.getNSSearchField())
+        self.start_scan()
+
+    def start_scan(self):
+        """在背景執行緒中掃描腳本，掃描結果會逐批加入列表"""
+        self.scanning = True
+        self.last_scan_search = 0.0
+        self.w.reloadButton.enable(False)
+        self.w.scanSpinner.start()
+        self.w.statusText.set("正在掃描腳本...")
+        threading.Thread(target=self.scan_in_background, daemon=True).start()
+
+    def scan_in_background(self):
+        """背景掃描：每批結果先加入搜尋索引，再交由主執行緒更新列表"""
+        try:
+            scanned_scripts = []
+            for batch in self.catalog.iter_scan_batches(self.catalog.directory):
+                # 視窗已關閉時中止掃描，未完成的掃描不會寫出快取
+                if self.closed:
+                    return
+                with self.profiler.span("index_add", scripts=len(batch)):
+                    self.search_index.add(batch)
+                scanned_scripts.extend(batch)
+                AppHelper.callAfter(self.add_scanned_scripts, batch)
+            # 掃描完成後才知道哪些腳本重複，從搜尋索引中移除多出來的副本
+            listed_scripts = set(self.catalog.scripts_info)
+            duplicates = [script for script in scanned_scripts if script not in listed_scripts]
+            if duplicates:
+                with self.profiler.span("index_update"):
+                    self.search_index.update(duplicates, [], self.catalog.scripts_info)
+        except Exception as e:
+            print(f"掃描腳本時發生錯誤：{e}")
+            traceback.print_exc()
+        AppHelper.callAfter(self.finish_scan)
+        if self.body_search and not self.closed:
+            self.update_body_index()
+
+    def add_scanned_scripts(self, batch):
+        """在主執行緒中加入一批掃描結果，並以目前的搜尋條件更新列表"""
+        if self.closed:
+            return
+        self.scripts_info.extend(batch)
+        self.w.statusText.set(f"正在掃描腳本... 已載入 {len(self.scripts_info)} 個")
+        self.search_scan_results()
+
+    def search_scan_results(self):
+        """
+        掃描中以目前的搜尋條件更新列表，不經過輸入的防抖動（否則批次間隔短於防抖動時間時，列表要到掃描結束才更新）：
+        第一批立即搜尋，之後最多每 SCAN_LIST_UPDATE_INTERVAL 秒一次；
+        已有排定的搜尋時不另外排定，它執行時同樣會搜尋到已加入索引的批次
+        """
+        query = self.w.searchBox.get()
+        with self.search_lock:
+            now = time.monotonic()
+            if now < self.search_due:
+                return
+            delay = max(0.0, self.last_scan_search + SCAN_LIST_UPDATE_INTERVAL - now)
+            self.last_scan_search = now + delay
+            self.schedule_search(query, delay)
+
+    def finish_scan(self):
+        """掃描完成"""
+        self.scanning = False
+        if self.closed:
+            return
+        self.scripts_info = self.catalog.scripts_info
+        self.w.scanSpinner.stop()
+        self.w.statusText.set(f"共 {len(self.scripts_info)} 個腳本")
+        self.w.reloadButton.enable(True)
+        self.search_scripts(self.w.searchBox)
+        print(f"總共提取了 {len(self.scripts_info)} 個腳本資訊資訊")
+        if self.w.watchCheckBox.get():
+            self.watcher.start()
+
+    def toggle_watch(self, sender):
+        """開啟或關閉自動更新"""
+        Glyphs.defaults[WATCH_SCRIPTS_KEY] = bool(sender.get())
+        if self.closed:
+            return
+        if not sender.get():
+            self.watcher.stop()
+        elif not self.scanning:
+            self.watcher.start()
+
+    def toggle_body_search(self, sender):
+        """開啟或關閉程式碼搜尋，開啟時在背景載入並更新索引"""
+        self.body_search = bool(sender.get())
+        Glyphs.defaults[BODY_SEARCH_KEY] = self.body_search
+        if self.body_search and not self.scanning:
+            threading.Thread(target=self.update_body_index, daemon=True).start()
+        self.search_scripts(self.w.searchBox)
+
+    def update_body_index(self):
+        """載入並增量更新程式碼索引（在背景執行緒中執行），完成後重新搜尋"""
+        try:
+            with self.body_index_lock, self.profiler.span("body_index"):
+                if not self.body_index.loaded:
+                    self.body_index.load()
+                snapshot = self.catalog.snapshot
+                file_stats = [
+                    (script.file_path, snapshot[(script.author, script.file_path)])
+                    for script in self.catalog.scripts_info
+                    if (script.author, script.file_path) in snapshot
+                ]
+                updated = self.body_index.update(file_stats, map_func=self.catalog.imap_concurrently)
+                self.body_index.save()
+        except Exception as e:
+            print(f"更新程式碼索引時發生錯誤：{e}")
+            traceback.print_exc()
+            return
+        if updated:
+            print(f"程式碼索引已更新 {updated} 個檔案")
+        AppHelper.callAfter(self.search_scripts, self.w.searchBox)
+
+    def window_closed(self, sender):
+        """關閉視窗時停止掃描、監看與尚未執行的搜尋，並寫出效能記錄"""
+        self.closed = True
+        self.watcher.stop()
+        if self.profiler.enabled:
+            self.dump_profile()
+        with self.search_lock:
+            self.search_generation += 1
+            if self.search_timer is not None:
+                self.search_timer.cancel()
+
+    def get_scan_workers(self):
+        """讀取掃描執行緒數的偏好設定"""
+        try:
+            scan_workers = int(Glyphs.defaults[SCAN_WORKERS_KEY] or DEFAULT_SCAN_WORKERS)
+        except (TypeError, ValueError):
+            scan_workers = DEFAULT_SCAN_WORKERS
+        return max(1, scan_workers)
+
+    def get_exclude_patterns(self):
+        """讀取排除規則的偏好設定，可為字串清單或以換行分隔的字串"""
+        exclude_patterns = Glyphs.defaults[EXCLUDE_PATTERNS_KEY]
+        if exclude_patterns is None:
+            return DEFAULT_EXCLUDE_PATTERNS
+        if isinstance(exclude_patterns, str):
+            return exclude_patterns.splitlines()
+        return [str(pattern) for pattern in exclude_patterns]
+
+    def search_scripts(self, sender):
+        """
+        搜尋腳本
+        停止輸入 SEARCH_DEBOUNCE_DELAY 秒後才在背景執行緒中搜尋，新的輸入會取消尚未完成的搜尋
+        """
+        query = sender.get()
+        with self.search_lock:
+            self.schedule_search(query, SEARCH_DEBOUNCE_DELAY)
+
+    def schedule_search(self, query, delay):
+        """排定 delay 秒後在背景執行緒中搜尋，並取消尚未完成的搜尋；呼叫時須持有 search_lock"""
+        if self.closed:
+            return
+        self.search_generation += 1
+        if self.search_timer is not None:
+            self.search_timer.cancel()
+        self.search_timer = threading.Timer(
+            delay, self.run_search, (self.search_generation, query, self.search_index))
+        self.search_timer.daemon = True
+        self.search_timer.start()
+        self.search_due = time.monotonic() + delay
+
+    def run_search(self, generation, query, search_index):
+        """在背景執行緒中搜尋，完成後交由主執行緒更新列表"""
+        def is_cancelled():
+            return generation != self.search_generation
+
+        if is_cancelled():
+            return
+        search_results = self.find_scripts(query, search_index, is_cancelled)
+        if search_results is not None and not is_cancelled():
+            AppHelper.callAfter(self.apply_search_results, generation, *search_results)
+
+    def find_scripts(self, query, search_index, is_cancelled):
+        """搜尋腳本，返回 (排序後的腳本, 程式碼符合的行)；取消或發生錯誤時返回 None"""
+        body_hits = {}
+        try:
+            text = parse_search_query(normalize_search_text(query)).text
+            if self.body_search and text.strip():
+                # 搜尋程式碼：依符合的行數排序
+                with self.profiler.span("body_search", query=query):
+                    body_hits = self.body_index.search(text)
+                    filtered_scripts = search_index.rank_paths(
+                        query, {file_path: len(lines) for file_path, lines in body_hits.items()})
+            else:
+                with self.profiler.span("search", query=query):
+                    filtered_scripts = search_index.rank(
+                        query, is_cancelled=is_cancelled, boosts=self.run_history.boosts())
+        except Exception as e:
+            print(f"搜尋腳本時發生錯誤：{e}")
+            traceback.print_exc()
+            return None
+        if filtered_scripts is None:
+            return None
+        return filtered_scripts, body_hits
+
+    def flush_pending_search(self):
+        """
+        還有尚未套用到列表的搜尋（仍在等待輸入停止或在背景執行）時，取消它並立即在主執行緒中搜尋、套用，
+        讓輸入後馬上按 Enter 執行的是新結果中選中的腳本，而不是輸入前選中的腳本
+        """
+        with self.search_lock:
+            if self.applied_generation == self.search_generation:
+                return
+            self.search_generation += 1
+            if self.search_timer is not None:
+                self.search_timer.cancel()
+            generation = self.search_generation
+        search_results = self.find_scripts(self.w.searchBox.get(), self.search_index, lambda: False)
+        if search_results is not None:
+            self.apply_search_results(generation, *search_results)
+
+    def apply_search_results(self, generation, filtered_scripts, body_hits=None):
+        """在主執行緒中套用搜尋結果，只接受最新一次查詢的結果"""
+        if generation == self.search_generation:
+            self.applied_generation = generation
+            self.body_hits = body_hits or {}
+            self.details_script = None  # 符合的行號可能改變，重新顯示詳細資訊
+            self.update_script_list(filtered_scripts)
+
+    def update_script_list(self, scripts, visible_count=LIST_PAGE_SIZE):
+        """
+        更新腳本列表
+        只顯示前 visible_count 個腳本，還有更多時在最後加上「顯示更多結果」列；
+        列表只套用與目前內容的差異；使用者選中的腳本仍在列表中時維持選取，否則選取第一個（最相關的）腳本
+        """
+        self.current_scripts = scripts
+        self.visible_count = min(len(scripts), visible_count)
+        selected_script_path = self.selected_script_path
+        with self.profiler.span("update_list", rows=self.visible_count):
+            visible_scripts = scripts[:self.visible_count]
+            keys = [(script.file_path, script.script_name) for script in visible_scripts]
+            if len(scripts) > self.visible_count:
+                more_row = f"顯示更多結果…（還有 {len(scripts) - self.visible_count} 個）"
+                keys.append((None, more_row))
+            self.updating_list = True
+            try:
+                self.apply_list_changes(keys)
+            finally:
+                self.updating_list = False
 
         # 如果腳本列表為空，清空詳細資訊並禁用執行按鈕
         if not scripts:
             self.w.detailsBox.set("")
             self.w.runButton.enable(False)
             self.selected_script_path = None
+            self.details_script = None
+            self.user_selected = False
+            return
+
+        # 保留使用者選中的腳本，否則選擇第一個（最相關的）腳本
+        selected_index = 0
+        user_selected = False
+        if self.user_selected:
+            for index, script in enumerate(visible_scripts):
+                if script.file_path == selected_script_path:
+                    selected_index = index
+                    user_selected = True
+                    break
+        self.user_selected = user_selected
+        self.auto_selecting = True
+        try:
+            if self.w.scriptList.getSelection() != [selected_index]:
+                self.w.scriptList.setSelection([selected_index])
+                self.w.scriptList.getNSTableView().scrollRowToVisible_(selected_index)
+            if self.details_script is not visible_scripts[selected_index]:
+                self.show_script_details(self.w.scriptList)
+        finally:
+            self.auto_selecting = False
+
+    def apply_list_changes(self, keys):
+        """
+        以 difflib 比對新舊列表的 (檔案路徑, 名稱)，只插入、刪除或替換有變動的列
+        由後往前套用，前面的索引不受影響；變動太多時直接替換整個列表
+        """
+        script_list = self.w.scriptList
+        old_keys = self.list_keys
+        self.list_keys = keys
+        rows = [name for file_path, name in keys]
+        if not old_keys or len(old_keys) + len(keys) > LIST_DIFF_MAX_ROWS:
+            script_list.set(rows)
+            return
+
+        opcodes = [
+            opcode for opcode in difflib.SequenceMatcher(None, old_keys, keys, autojunk=False).get_opcodes()
+            if opcode[0] != 'equal'
+        ]
+        if sum(max(i2 - i1, j2 - j1) for tag, i1, i2, j1, j2 in opcodes) > LIST_DIFF_MAX_CHANGES:
+            script_list.set(rows)
+            return
+
+        for tag, i1, i2, j1, j2 in reversed(opcodes):
+            replaced = min(i2 - i1, j2 - j1)
+            for offset in range(replaced):
+                script_list[i1 + offset] = rows[j1 + offset]
+            for index in range(i2 - 1, i1 + replaced - 1, -1):
+                del script_list[index]
+            for offset in range(replaced, j2 - j1):
+                script_list.insert(i1 + offset, rows[j1 + offset])
+
+    def show_more_results(self):
+        """載入下一頁的腳本，並選取新載入的第一個腳本"""
+        first_new_index = self.visible_count
+        self.selected_script_path = self.current_scripts[first_new_index].file_path
+        self.user_selected = True
+        self.update_script_list(self.current_scripts, self.visible_count + LIST_PAGE_SIZE)
 
     def show_script_details(self, sender):
         """顯示腳本詳細資訊"""
+        if self.updating_list:
+            return
         selection = sender.getSelection()
+        if selection and selection[0] >= self.visible_count:
+            # 選取「顯示更多結果」列
+            self.show_more_results()
+            return
         if selection and self.current_scripts:
             script = self.current_scripts[selection[0]]
 
-            # 從描述中分離 GUI 標記和實際描述
-            description = script['description']
-            gui_tag = ""
-            if description.startswith("(GUI) "):
-                gui_tag = "(GUI)"
-                description = description[6:].strip()  # 移除 "(GUI) " 前綴
+            description = script.description
+            gui_tag = "(GUI)" if script.uses_gui else ""
 
             details = "{} {}\n\n作者：{}\n\n說明：\n{}".format(
-                script['script_name'], gui_tag, script['author'], description)
+                script.script_name, gui_tag, script.author, description)
+            history = self.run_history.get(script.file_path)
+            if history:
+                last_run = time.strftime("%Y-%m-%d %H:%M", time.localtime(history["last_run"]))
+                average_duration = history["total_duration"] / history["count"]
+                details += "\n\n已執行 {} 次，上次執行：{}，平均耗時 {:.2f} 秒".format(
+                    history["count"], last_run, average_duration)
+            if script.duplicate_paths:
+                details += "\n\n相同的腳本也位於：\n" + "\n".join(
+                    f"{author}：{file_path.replace(os.path.expanduser('~'), '~', 1)}"
+                    for author, file_path in script.duplicate_paths)
+            line_numbers = self.body_hits.get(script.file_path)
+            if line_numbers:
+                details += "\n\n程式碼符合：\n" + self.format_body_hits(script.file_path, line_numbers)
             self.w.detailsBox.set(details)
 
             # 啟用執行按鈕並儲存選中腳本的路徑
             self.w.runButton.enable(True)
-            self.selected_script_path = script['file_path']
+            self.selected_script_path = script.file_path
+            self.details_script = script
+            if not self.auto_selecting:
+                self.user_selected = True
         else:
             # 如果沒有選擇或腳本列表為空，清空詳細資訊並禁用執行按鈕
             self.w.detailsBox.set("")
             self.w.runButton.enable(False)
             self.selected_script_path = None
+            self.details_script = None
+            self.user_selected = False
+
+    def format_body_hits(self, file_path, line_numbers):
+        """讀取選中腳本的符合行，格式為「行號: 內容」"""
+        wanted = set(line_numbers[:BODY_MAX_DETAIL_LINES])
+        lines = []
+        try:
+            with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+                for line_number, line in enumerate(f, 1):
+                    if line_number in wanted:
+                        lines.append(f"{line_number}: {line.strip()}")
+                        if len(lines) == len(wanted):
+                            break
+        except OSError as e:
+            return f"讀取檔案時發生錯誤: {str(e)}"
+        if len(line_numbers) > len(wanted):
+            lines.append(f"…還有 {len(line_numbers) - len(wanted)} 行")
+        return "\n".join(lines)
 
     def reload_scripts(self, sender=None):
-        """重新加載所有腳本"""
+        """重新加載腳本，在背景執行緒中只處理新增、變更或刪除的檔案"""
+        if self.scanning:
+            return
         print("開始重新加載腳本...")  # 這個資訊總是顯示
-        self.scripts_info = self.get_scripts_info()
-        self.update_script_list(self.scripts_info)
-        print(f"重新加載完成,共加載 {len(self.scripts_info)} 個腳本")  # 這個資訊總是顯示
+        threading.Thread(target=self.refresh_scripts, kwargs={"announce": True}, daemon=True).start()
 
-    def debug_print(self, *args, **kwargs):
-        if self.debug_mode:
-            print(*args, **kwargs)
+    def refresh_scripts(self, announce=False):
+        """
+        增量更新目錄與搜尋索引（在背景執行緒中執行），完成後交由主執行緒更新列表
+        announce: 沒有任何變更時是否仍然顯示結果（自動更新時不顯示）
+        """
+        try:
+            with self.refresh_lock:
+                result = self.catalog.refresh()
+                with self.profiler.span("index_update"):
+                    self.search_index.update(result.removed_scripts, result.added_scripts, self.catalog.scripts_info)
+            if self.body_search and (result.added or result.changed or result.removed):
+                self.update_body_index()
+        except Exception as e:
+            print(f"重新加載腳本時發生錯誤：{e}")
+            traceback.print_exc()
+            return
+        if announce or result.added or result.changed or result.removed:
+            AppHelper.callAfter(self.finish_refresh, result)
 
-    def toggle_debug_mode(self, sender):
-        self.debug_mode = not self.debug_mode
-        status = "開啟" if self.debug_mode else "關閉"
-        print(f"調試模式已{status}")  # 這裡使用普通的 print,因為我們總是想看到這條消息
+    def finish_refresh(self, result):
+        """在主執行緒中套用重新整理的結果"""
+        if self.closed:
+            return
+        self.scripts_info = self.catalog.scripts_info
+        self.w.statusText.set(f"共 {len(self.scripts_info)} 個腳本")
+        self.search_scripts(self.w.searchBox)
+        print(f"重新加載完成：新增 {result.added} 個、變更 {result.changed} 個、移除 {result.removed} 個檔案，共加載 {len(self.scripts_info)} 個腳本")  # 這個資訊總是顯示
+
+    def toggle_profiling(self, sender):
+        """開啟或關閉效能記錄，關閉時寫出記錄結果"""
+        enabled = bool(sender.get())
+        Glyphs.defaults[PROFILING_KEY] = enabled
+        if enabled:
+            self.profiler.reset()
+            self.profiler.enabled = True
+        else:
+            self.profiler.enabled = False
+            self.dump_profile()
+        status = "開啟" if enabled else "關閉"
+        print(f"效能記錄已{status}")  # 這裡使用普通的 print,因為我們總是想看到這條消息
+
+    def dump_profile(self):
+        """輸出效能記錄摘要，並將摘要 JSON 與 Chrome trace 寫入 PROFILE_DIRECTORY"""
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        summary_path = os.path.join(PROFILE_DIRECTORY, f"profile-{timestamp}.json")
+        trace_path = os.path.join(PROFILE_DIRECTORY, f"trace-{timestamp}.json")
+        try:
+            self.profiler.print_summary()
+            self.profiler.dump(summary_path)
+            self.profiler.dump(trace_path, chrome_trace=True)
+            print(f"效能記錄已寫入：{summary_path}\n{trace_path}")
+        except Exception as e:
+            print(f"寫入效能記錄時發生錯誤：{e}")
+            traceback.print_exc()
 
     def run_script(self, sender):
         """執行選中的腳本"""
         try:
+            self.flush_pending_search()
             if hasattr(self, 'selected_script_path') and self.selected_script_path:
                 # 獲取當前字體
                 font = Glyphs.font
@@ -282,12 +2471,19 @@ class ScriptFinderTool:
                     # 添加其他可能需要的全局變量
                 }
 
-                # 讀取腳本內容
-                with open(self.selected_script_path, 'r', encoding='utf-8') as file:
-                    script_content = file.read()
+                # 取得編譯後的腳本（檔案未變更時直接使用快取）
+                with self.profiler.span("compile", path=self.selected_script_path):
+                    script_code = self.code_cache.get_code(self.selected_script_path)
 
-                # 執行腳本
-                exec(script_content, global_namespace)
+                # 執行腳本，並記錄執行時間供排序使用
+                script_path = self.selected_script_path
+                run_time = time.time()
+                run_start = time.perf_counter()
+                try:
+                    with self.profiler.span("run_script", path=script_path):
+                        exec(script_code, global_namespace)
+                finally:
+                    self.run_history.record(script_path, run_time, time.perf_counter() - run_start)
             else:
                 print("請先選擇一個腳本")
         except NameError as e:
@@ -299,4 +2495,5 @@ class ScriptFinderTool:
             print("錯誤詳情：")
             traceback.print_exc()
 
-ScriptFinderTool()
+if __name__ == "__main__":
+    ScriptFinderTool()
@@ -17,12 +17,47 @@ Glyphs 剪貼簿編碼轉換腳本
 - 多行編碼批量轉換
 - 自動識別編碼格式
 - 錯誤處理與詳細報告
+- 自由格式擷取：按住 Option 鍵執行（或逐行格式找不到任何編碼時），從任意文字（CSV、表格、以逗號或空白分隔的列表）中依序擷取 uniXXXX、U+XXXX、0xXXXX
 """
 
 import re
 import subprocess
+from AppKit import NSEvent, NSEventModifierFlagOption
 from GlyphsApp import *
 
+MAX_CODE_POINT = 0x10FFFF
+
+# 單行編碼的比對規則：各格式依序排列，先符合的優先（uni → U+ → 0x → 純十六進位 → 十進位），
+# 其餘內容由 other 接住，因此每一行恰好產生一個比對結果
+CODE_LINE_PATTERN = re.compile(r'''
+    ^[^\S\n]*
+    (?:
+        uni(?P<uni>[0-9A-Fa-f]{4,6})
+      | U\+(?P<uplus>[0-9A-Fa-f]{4,6})
+      | 0x(?P<hex0x>[0-9A-Fa-f]{4,6})
+      | (?P<hex>[0-9A-Fa-f]{4,6})
+      | (?P<dec>\d{1,7})
+      | (?P<other>.*?)
+    )
+    [^\S\n]*$
+''', re.IGNORECASE | re.MULTILINE | re.VERBOSE)
+
+# 自由格式擷取的比對規則：只認有前綴的編碼，前後不可緊接英數字（底線、標點、空白、中文都可以當分隔），
+# 其餘連續的文字（不含底線）由 other 接住，用來計算無法識別的片段數；
+# other 的英數字與其他文字（例如中文）分開比對，編碼緊接在中文之後時（東uni6771）才能在英數字的開頭重新比對編碼
+CODE_TOKEN_PATTERN = re.compile(r'''
+    (?<![0-9A-Za-z])
+    (?:
+        uni(?P<uni>[0-9A-Fa-f]{4,6})
+      | U\+(?P<uplus>[0-9A-Fa-f]{4,6})
+      | 0x(?P<hex0x>[0-9A-Fa-f]{4,6})
+    )
+    (?![0-9A-Za-z])
+  | (?P<other>[0-9A-Za-z]+|[^\W_0-9A-Za-z]+)
+''', re.IGNORECASE | re.VERBOSE)
+
+CODE_BASES = {'uni': 16, 'uplus': 16, 'hex0x': 16, 'hex': 16, 'dec': 10}
+
 def get_clipboard_content():
     """取得剪貼簿內容"""
     try:
@@ -33,55 +68,45 @@ def get_clipboard_content():
         print(f"無法取得剪貼簿內容: {e}")
         return None
 
+def code_point_from_match(match):
+    """將 CODE_LINE_PATTERN 的比對結果轉換為 Unicode 碼點，無法識別或超出範圍時返回 None"""
+    kind = match.lastgroup
+    if kind == 'other':
+        return None
+    digits = match.group(kind)
+    code_point = int(digits, CODE_BASES[kind])
+    # 純十六進位超出範圍時，與過去逐一嘗試格式相同，改以十進位解讀全數字的內容
+    if code_point > MAX_CODE_POINT and kind == 'hex' and digits.isdigit():
+        code_point = int(digits, 10)
+    if code_point > MAX_CODE_POINT:
+        return None
+    return code_point
+
 def parse_encoding_format(text):
     """解析各種編碼格式並返回 Unicode 碼點"""
     if not text:
         return None
     
-    text = text.strip()
-    
-    # 支援的格式模式
-    patterns = [
-        # uni6771 格式
-        (r'^uni([0-9A-Fa-f]{4,6})$', 16),
-        # U+6771 格式
-        (r'^U\+([0-9A-Fa-f]{4,6})$', 16),
-        # 0x6771 格式
-        (r'^0x([0-9A-Fa-f]{4,6})$', 16),
-        # 純十六進位 6771
-        (r'^([0-9A-Fa-f]{4,6})$', 16),
-        # 十進位格式 26481
-        (r'^(\d{1,7})$', 10),
-    ]
-    
-    for pattern, base in patterns:
-        match = re.match(pattern, text, re.IGNORECASE)
-        if match:
-            try:
-                code_point = int(match.group(1), base)
-                # 檢查是否為有效的 Unicode 範圍
-                if 0 <= code_point <= 0x10FFFF:
-                    return code_point
-            except ValueError:
-                continue
-    
-    return None
+    match = CODE_LINE_PATTERN.fullmatch(text.strip())
+    if not match:
+        return None
+    return code_point_from_match(match)
 
 def parse_multiple_encodings(text):
     """解析多行編碼格式並返回 Unicode 碼點列表"""
     if not text:
         return []
     
-    lines = text.strip().split('\n')
     code_points = []
     failed_lines = []
     
-    for line in lines:
-        line = line.strip()
+    # 每一行恰好對應一個比對結果，直接在整段文字上掃描，不必先切成行列表
+    for match in CODE_LINE_PATTERN.finditer(text):
+        line = match.group().strip()
         if not line:  # 跳過空行
             continue
             
-        code_point = parse_encoding_format(line)
+        code_point = code_point_from_match(match)
         if code_point is not None:
             code_points.append((line, code_point))
         else:
@@ -89,6 +114,32 @@ def parse_multiple_encodings(text):
     
     return code_points, failed_lines
 
+def extract_encodings(text):
+    """
+    自由格式：從任意文字中依原本順序擷取所有編碼
+    返回 (碼點列表, 無法識別的片段列表)，格式與 parse_multiple_encodings 相同
+    """
+    if not text:
+        return [], []
+    
+    code_points = []
+    unrecognized_spans = []
+    
+    for match in CODE_TOKEN_PATTERN.finditer(text):
+        token = match.group()
+        code_point = code_point_from_match(match)
+        if code_point is not None:
+            code_points.append((token, code_point))
+        else:
+            unrecognized_spans.append(token)
+    
+    return code_points, unrecognized_spans
+
+def is_option_key_pressed():
+    """檢查是否按住 Option 鍵"""
+    modifier_flags = NSEvent.modifierFlags()
+    return bool(modifier_flags & NSEventModifierFlagOption)
+
 def unicode_to_character(code_point):
     """將 Unicode 碼點轉換為字符"""
     try:
@@ -142,6 +193,49 @@ def insert_at_cursor(text_to_insert):
         print(f"插入文字時發生錯誤: {e}")
         return False
 
+def insert_multiple_characters(code_points, failed_items, free_form=False):
+    """將多個碼點轉換為字符並插入到游標位置"""
+    # 轉換所有有效的編碼為字符
+    characters = []
+    conversion_info = []
+    
+    for original_text, code_point in code_points:
+        character = unicode_to_character(code_point)
+        if character:
+            characters.append(character)
+            conversion_info.append(f"{original_text} → {character} (U+{code_point:04X})")
+            print(f"{original_text} → {character} (U+{code_point:04X})")
+    
+    if not characters:
+        Message("無法轉換為字符", "沒有可轉換的有效 Unicode 碼點")
+        return
+    
+    # 將所有字符組合成字串
+    result_text = ''.join(characters)
+    
+    # 插入到游標位置
+    if insert_at_cursor(result_text):
+        # 準備詳細的轉換資訊
+        info_text = f"成功轉換 {len(characters)} 個編碼：\n\n"
+        info_text += '\n'.join(conversion_info[:10])  # 最多顯示 10 個
+        if len(conversion_info) > 10:
+            info_text += f"\n... 還有 {len(conversion_info) - 10} 個"
+        
+        if failed_items:
+            if free_form:
+                info_text += f"\n\n略過 {len(failed_items)} 段無法識別的文字：\n"
+            else:
+                info_text += f"\n\n無法識別 {len(failed_items)} 個格式：\n"
+            info_text += '\n'.join(failed_items[:5])  # 最多顯示 5 個失敗的
+            if len(failed_items) > 5:
+                info_text += f"\n... 還有 {len(failed_items) - 5} 個"
+        
+        if free_form:
+            print(f"自由格式擷取：轉換 {len(characters)} 個編碼，略過 {len(failed_items)} 段無法識別的文字")
+        # Message("批量轉換成功", info_text)
+    else:
+        Message("插入失敗", "無法將字符插入到編輯視圖")
+
 def main():
     """主要執行函式"""
     # 取得剪貼簿內容
@@ -153,12 +247,33 @@ def main():
     
     print(f"剪貼簿內容: {clipboard_content}")
     
-    # 檢查是否為多行內容
-    lines = clipboard_content.strip().split('\n')
+    # 按住 Option 鍵執行：從任意文字中擷取編碼
+    if is_option_key_pressed():
+        code_points, unrecognized_spans = extract_encodings(clipboard_content)
+        
+        if not code_points:
+            Message("找不到編碼", 
+                    f"剪貼簿中沒有可擷取的編碼（略過 {len(unrecognized_spans)} 段無法識別的文字）\n\n" +
+                    "自由格式支援：\n" +
+                    "• uni6771\n" +
+                    "• U+6771\n" +
+                    "• 0x6771")
+            return
+        
+        insert_multiple_characters(code_points, unrecognized_spans, free_form=True)
+        return
     
-    if len(lines) > 1:
+    # 檢查是否為多行內容
+    if '\n' in clipboard_content.strip():
         # 處理多行編碼
         code_points, failed_lines = parse_multiple_encodings(clipboard_content)
+        free_form = False
+        
+        if not code_points:
+            # 逐行格式找不到任何編碼時，改用自由格式擷取
+            extracted, unrecognized_spans = extract_encodings(clipboard_content)
+            if extracted:
+                code_points, failed_lines, free_form = extracted, unrecognized_spans, True
         
         if not code_points and failed_lines:
             Message("無法識別的編碼格式", 
@@ -171,47 +286,19 @@ def main():
                     "• 26481")
             return
         
-        # 轉換所有有效的編碼為字符
-        characters = []
-        conversion_info = []
-        
-        for original_text, code_point in code_points:
-            character = unicode_to_character(code_point)
-            if character:
-                characters.append(character)
-                conversion_info.append(f"{original_text} → {character} (U+{code_point:04X})")
-                print(f"{original_text} → {character} (U+{code_point:04X})")
-        
-        if not characters:
-            Message("無法轉換為字符", "沒有可轉換的有效 Unicode 碼點")
-            return
-        
-        # 將所有字符組合成字串
-        result_text = ''.join(characters)
-        
-        # 插入到游標位置
-        if insert_at_cursor(result_text):
-            # 準備詳細的轉換資訊
-            info_text = f"成功轉換 {len(characters)} 個編碼：\n\n"
-            info_text += '\n'.join(conversion_info[:10])  # 最多顯示 10 個
-            if len(conversion_info) > 10:
-                info_text += f"\n... 還有 {len(conversion_info) - 10} 個"
-            
-            if failed_lines:
-                info_text += f"\n\n無法識別 {len(failed_lines)} 個格式：\n"
-                info_text += '\n'.join(failed_lines[:5])  # 最多顯示 5 個失敗的
-                if len(failed_lines) > 5:
-                    info_text += f"\n... 還有 {len(failed_lines) - 5} 個"
-            
-            # Message("批量轉換成功", info_text)
-        else:
-            Message("插入失敗", "無法將字符插入到編輯視圖")
+        insert_multiple_characters(code_points, failed_lines, free_form)
             
     else:
         # 處理單行編碼（原有邏輯）
         code_point = parse_encoding_format(clipboard_content)
         
         if code_point is None:
+            # 單一編碼格式不符時，改用自由格式擷取（例如以逗號或空白分隔的列表）
+            code_points, unrecognized_spans = extract_encodings(clipboard_content)
+            if code_points:
+                insert_multiple_characters(code_points, unrecognized_spans, free_form=True)
+                return
+            
             Message("無法識別的編碼格式", 
                     f"剪貼簿內容「{clipboard_content}」不是支援的編碼格式\n\n" +
                     "支援的格式：\n" +
@@ -1,80 +1,276 @@
 # -*- coding: utf-8 -*-
 # 用法: 進入 tools 目錄，執行 python README_updateList.py
+#       加上 --check 只檢查 README.md 是否需要更新（需要更新時以非零值結束），不寫入任何檔案，可用於 pre-commit
 # 描述: 這個工具會自動更新 README.md 的腳本列表，讓你不用手動維護。請確保你的README.md中包含## 腳本列表這個標題，腳本會在這個標題下方放置腳本列表。
+#       每個檔案的解析結果會依內容雜湊快取在 .README_updateList_cache.json，只有變更過的檔案才會重新解析；
+#       README.md 只有在內容真的改變時才會寫入（先寫入暫存檔再取代）。
+#       說明取自模組開頭的說明字串或 __doc__ 指定，只讀取檔案開頭；檔案很多時可加上 --jobs N 以多個行程解析。
 
+import io
 import os
+import ast
+import sys
+import json
+import stat
+import hashlib
+import argparse
+import tempfile
+import tokenize
+from concurrent.futures import ProcessPoolExecutor
 
-def get_script_descriptions(directory):
-    descriptions = {"主目錄": []}
+CACHE_FILENAME = ".README_updateList_cache.json"
+CACHE_VERSION = 2
+
+# 走訪時略過的資料夾（另外所有以 . 開頭的資料夾也會略過）
+IGNORED_DIRECTORIES = {"__pycache__", "venv", "env", "node_modules", "site-packages"}
+
+# 模組開頭允許出現在說明字串之前的敘述
+HEADER_KEYWORDS = ("import", "from")
+
+
+def load_cache(cache_path):
+    """讀取快取：{相對路徑: {"size", "mtime", "hash", "script"}}，格式不符時視為空快取"""
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        if data.get("version") == CACHE_VERSION:
+            return data.get("files", {})
+    except FileNotFoundError:
+        pass
+    except (IOError, ValueError) as e:
+        print(f"Error reading cache file {cache_path}: {e}")
+    return {}
+
+def write_atomically(file_path, content):
+    """先寫入同一資料夾的暫存檔再取代原檔案，並保留原檔案的權限"""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(content)
+        if os.path.exists(file_path):
+            os.chmod(temp_path, stat.S_IMODE(os.stat(file_path).st_mode))
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def save_cache(cache_path, cache):
+    try:
+        write_atomically(cache_path, json.dumps({"version": CACHE_VERSION, "files": cache}, ensure_ascii=False))
+    except IOError as e:
+        print(f"Error writing cache file {cache_path}: {e}")
+
+def statement_docstring(tokens):
+    """敘述只由字串組成（或是 __doc__ = 字串）時返回字串內容，否則返回 None"""
+    if len(tokens) > 2 and tokens[0].string == "__doc__" and tokens[1].string == "=":
+        tokens = tokens[2:]
+    if not all(token.type == tokenize.STRING for token in tokens):
+        return None
+    try:
+        value = ast.literal_eval(" ".join(token.string for token in tokens))
+    except (ValueError, SyntaxError):
+        return None
+    return value if isinstance(value, str) else None
+
+def read_script_header(readline, filename):
+    """
+    以 tokenize 讀取模組開頭，返回 (MenuTitle, 說明)，沒有說明時返回 None
+    只讀到第一個不是 import、說明字串或 __doc__ 指定的敘述為止，檔案後面的三引號字串不會被誤認為說明
+    """
+    menu_title = None
+    description = None
+    statement = []
+    for token in tokenize.tokenize(readline):
+        if token.type == tokenize.COMMENT:
+            if menu_title is None and token.string.startswith("# MenuTitle:"):
+                menu_title = token.string[len("# MenuTitle:"):].strip()
+        elif token.type in (tokenize.NEWLINE, tokenize.ENDMARKER):
+            if statement:
+                docstring = statement_docstring(statement)
+                if docstring is None and statement[0].string not in HEADER_KEYWORDS:
+                    break
+                if description is None:
+                    description = docstring
+                statement = []
+            if menu_title is not None and description is not None:
+                break
+        elif token.type not in (tokenize.ENCODING, tokenize.NL, tokenize.INDENT, tokenize.DEDENT):
+            statement.append(token)
+
+    if description is None:
+        return None
+    return menu_title if menu_title is not None else filename, description.strip()
+
+def parse_script_file(file_path, filename, cached):
+    """
+    讀取單一檔案並返回新的快取項目，讀取失敗時返回 None
+    內容雜湊與快取相同時不重新解析；這個函式會在子行程中執行
+    """
+    try:
+        file_stat = os.stat(file_path)
+        with open(file_path, 'rb') as file:
+            data = file.read()
+    except IOError as e:
+        print(f"Error reading file {file_path}: {e}")
+        return None
+
+    digest = hashlib.sha1(data).hexdigest()
+    if cached and cached["hash"] == digest:
+        script = cached["script"]
+    else:
+        try:
+            script = read_script_header(io.BytesIO(data).readline, filename)
+        except (SyntaxError, UnicodeDecodeError, tokenize.TokenError) as e:
+            print(f"Error parsing file {file_path}: {e}")
+            script = None
+    return {"size": file_stat.st_size, "mtime": file_stat.st_mtime_ns, "hash": digest, "script": script}
+
+def is_cached_entry_fresh(file_path, cached):
+    """檔案大小與修改時間都和快取相同時不必重新讀取"""
+    if not cached:
+        return False
+    try:
+        file_stat = os.stat(file_path)
+    except OSError:
+        return False
+    return cached["size"] == file_stat.st_size and cached["mtime"] == file_stat.st_mtime_ns
+
+def find_script_files(directory):
+    """返回 [(區段標題, 相對路徑, 完整路徑, 檔名)]，走訪時略過版本控制、快取和隱藏資料夾"""
+    script_files = []
     for root, dirs, files in os.walk(directory):
-        for filename in files:
+        dirs[:] = sorted(name for name in dirs if name not in IGNORED_DIRECTORIES and not name.startswith("."))
+        relative_path = os.path.relpath(root, directory)
+        section_title = relative_path if relative_path != "." else "主目錄"
+        for filename in sorted(files):
             if filename.endswith(".py") and filename != "README_updateList.py":
                 file_path = os.path.join(root, filename)
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as file:
-                        content = file.read()
-                        start = content.find('"""')
-                        end = content.find('"""', start + 3)
-                        menu_title_start = content.find('# MenuTitle:')
-                        menu_title_end = content.find('\n', menu_title_start) if menu_title_start != -1 else -1
-                        
-                        if start != -1 and end != -1:
-                            description = content[start + 3:end].strip()
-                            menu_title = content[menu_title_start + len('# MenuTitle:'):menu_title_end].strip() if menu_title_start != -1 else filename
-                            relative_path = os.path.relpath(root, directory)
-                            section_title = relative_path if relative_path != "." else "主目錄"
-                            if section_title not in descriptions:
-                                descriptions[section_title] = []
-                            descriptions[section_title].append(f"- **{menu_title}** : {description}")
-                except IOError as e:
-                    print(f"Error reading file {file_path}: {e}")
+                script_files.append((section_title, os.path.relpath(file_path, directory), file_path, filename))
+    return script_files
+
+def get_script_descriptions(directory, cache=None, jobs=1):
+    """
+    返回 {區段標題: [列表項目]}
+    cache: load_cache 讀入的快取，會就地更新為本次的結果（並移除已不存在的檔案）
+    jobs: 大於 1 時以多個行程讀取、解析有變更的檔案
+    """
+    script_files = find_script_files(directory)
+    entries = {}
+    pending = []
+    for section_title, relative_file, file_path, filename in script_files:
+        cached = cache.get(relative_file) if cache else None
+        if is_cached_entry_fresh(file_path, cached):
+            entries[relative_file] = cached
+        else:
+            pending.append((relative_file, file_path, filename, cached))
+
+    if pending:
+        arguments = list(zip(*pending))[1:]
+        if jobs > 1 and len(pending) > 1:
+            chunk_size = max(1, len(pending) // (jobs * 4))
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(parse_script_file, *arguments, chunksize=chunk_size))
+        else:
+            results = list(map(parse_script_file, *arguments))
+        for (relative_file, *_), entry in zip(pending, results):
+            if entry is not None:
+                entries[relative_file] = entry
+
+    descriptions = {"主目錄": []}
+    for section_title, relative_file, file_path, filename in script_files:
+        entry = entries.get(relative_file)
+        if entry is not None and entry["script"] is not None:
+            menu_title, description = entry["script"]
+            if section_title not in descriptions:
+                descriptions[section_title] = []
+            descriptions[section_title].append(f"- **{menu_title}** : {description}")
+
+    if cache is not None:
+        cache.clear()
+        cache.update(entries)
     return descriptions
 
-def update_readme(readme_path, descriptions):
+def build_readme(lines, descriptions):
+    """在記憶體中產生新的 README 內容，找不到 ## 腳本列表 時返回 None"""
+    start_index = None
+    end_index = None
+    for i, line in enumerate(lines):
+        if line.strip() == "## 腳本列表":
+            start_index = i
+        elif start_index is not None and line.strip().startswith("## "):
+            end_index = i
+            break
+
+    if start_index is None:
+        return None
+    if end_index is None:
+        end_index = len(lines)
+
+    new_lines = lines[:start_index + 1] + ["\n"]  # 標題後加空行
+
+    # 先加入主目錄的內容
+    if "主目錄" in descriptions:
+        new_lines.extend([item + "\n" for item in sorted(descriptions["主目錄"])])
+        new_lines.extend(["\n"])  # 主目錄內容後加兩個空行
+
+    # 再加入子資料夾的內容
+    for section, descs in sorted(descriptions.items()):
+        if section != "主目錄":
+            new_lines.extend([f"### {section}\n"])  # 子資料夾標題後加空行
+            new_lines.extend([item + "\n" for item in sorted(descs)])
+            new_lines.append("\n")  # 每個子資料夾後加空行
+
+    # new_lines.append("\n")  # 整個列表最後加空行
+    new_lines += lines[end_index:]
+    return "".join(new_lines)
+
+def update_readme(readme_path, descriptions, check=False):
+    """
+    更新 README.md，返回內容是否需要更新；發生錯誤時返回 None
+    內容沒有改變時不寫入；check 為 True 時只比較、不寫入
+    """
     try:
         with open(readme_path, 'r', encoding='utf-8') as file:
-            lines = file.readlines()
-
-        start_index = None
-        end_index = None
-        for i, line in enumerate(lines):
-            if line.strip() == "## 腳本列表":
-                start_index = i
-            elif start_index is not None and line.strip().startswith("## "):
-                end_index = i
-                break
+            content = file.read()
 
-        if start_index is not None:
-            if end_index is None:
-                end_index = len(lines)
-            
-            new_lines = lines[:start_index + 1] + ["\n"]  # 標題後加空行
-            
-            # 先加入主目錄的內容
-            if "主目錄" in descriptions:
-                new_lines.extend([item + "\n" for item in sorted(descriptions["主目錄"])])
-                new_lines.extend(["\n"])  # 主目錄內容後加兩個空行
-            
-            # 再加入子資料夾的內容
-            for section, descs in sorted(descriptions.items()):
-                if section != "主目錄":
-                    new_lines.extend([f"### {section}\n"])  # 子資料夾標題後加空行
-                    new_lines.extend([item + "\n" for item in sorted(descs)])
-                    new_lines.append("\n")  # 每個子資料夾後加空行
-            
-            # new_lines.append("\n")  # 整個列表最後加空行
-            new_lines += lines[end_index:]
-            
-            with open(readme_path, 'w', encoding='utf-8') as file:
-                file.writelines(new_lines)
-        else:
+        new_content = build_readme(content.splitlines(keepends=True), descriptions)
+        if new_content is None:
             print("Error: '## 腳本列表' section not found in README.md")
+            return None
+        if new_content == content:
+            return False
+        if not check:
+            write_atomically(readme_path, new_content)
+        return True
     except IOError as e:
         print(f"Error updating README file: {e}")
+        return None
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="更新 README.md 的腳本列表")
+    parser.add_argument("--check", action="store_true", help="只檢查 README.md 是否需要更新，需要更新時以非零值結束")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="解析檔案的行程數，0 表示使用所有 CPU 核心（預設 1）")
+    args = parser.parse_args()
+
     script_dir = os.path.dirname(os.path.abspath(__file__))
     directory = os.path.join(script_dir, "..")  # 請確保這是正確的目錄路徑
     readme_path = os.path.join(script_dir, "../README.md")
-    descriptions = get_script_descriptions(directory)
-    update_readme(readme_path, descriptions)
+    cache_path = os.path.join(script_dir, CACHE_FILENAME)
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    cache = load_cache(cache_path)
+    previous_cache = dict(cache)
+    descriptions = get_script_descriptions(directory, cache, jobs=jobs)
+    # --check 不寫入任何檔案（包括快取），不會改變工作目錄
+    if cache != previous_cache and not args.check:
+        save_cache(cache_path, cache)
+
+    changed = update_readme(readme_path, descriptions, check=args.check)
+    if args.check:
+        if changed is None:
+            sys.exit(2)
+        if changed:
+            print("README.md 的腳本列表需要更新，請執行 python README_updateList.py")
+            sys.exit(1)
+        print("README.md 的腳本列表已是最新")
@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+# 用法: 進入 tools 目錄，執行 python ScriptFinder_benchmark.py [選項]（python ScriptFinder_benchmark.py -h 查看所有選項）
+# 描述: 產生合成的 Scripts 資料夾，在沒有 Glyphs 的環境下（以替代模組取代 GlyphsApp 與 vanilla）
+#       測量腳本搜尋器的冷掃描、熱掃描、增量重新整理、索引建立與搜尋延遲，以及記憶體用量。
+#       搭配 --json 輸出結果，可以追蹤每次修改前後的效能變化。
+
+import os
+import sys
+import json
+import time
+import types
+import random
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import importlib.util
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPO_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DOC_QUOTES = '"' * 3
+
+LATIN_WORDS = [
+    "Kern", "Smart", "Component", "Anchor", "Master", "Width", "Glyph", "Layer", "Path", "Stroke",
+    "Metrics", "Align", "Center", "Copy", "Paste", "Compare", "Interpolation", "Spacing", "Font",
+    "Rename", "Export", "Hinting", "Color", "Features", "Sidebearings", "Batch", "Clean", "Report",
+]
+CJK_WORDS = [
+    "字形", "組件", "智慧", "中心", "對齊", "錨點", "主板", "寬度", "圖層", "路徑", "筆劃", "間距",
+    "字距", "複製", "貼上", "比較", "內插", "匯出", "重新命名", "顏色", "清理", "報告", "批次", "部件",
+]
+
+
+# 以最小的替代模組取代 Glyphs 專屬的模組，只有在無法匯入時才替代 PyObjC 的模組
+def install_stub_modules():
+    class Widget(object):
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def __getattr__(self, name):
+            return lambda *args, **kwargs: None
+
+    class Defaults(dict):
+        def __getitem__(self, key):
+            return self.get(key)
+
+    vanilla = types.ModuleType("vanilla")
+    for name in ("Window", "FloatingWindow", "SearchBox", "List", "TextEditor", "TextBox",
+                 "Button", "CheckBox", "ProgressSpinner"):
+        setattr(vanilla, name, Widget)
+    sys.modules["vanilla"] = vanilla
+
+    glyphs_app = types.ModuleType("GlyphsApp")
+    glyphs_app.Glyphs = types.SimpleNamespace(versionNumber=3, defaults=Defaults(), font=None)
+    glyphs_app.NSFont = Widget()
+    glyphs_app.Message = print
+    glyphs_app.__all__ = ["Glyphs", "NSFont", "Message"]
+    sys.modules["GlyphsApp"] = glyphs_app
+    plugins = types.ModuleType("GlyphsApp.plugins")
+    plugins.__all__ = []
+    sys.modules["GlyphsApp.plugins"] = plugins
+
+    try:
+        import Foundation, AppKit, objc
+        from PyObjCTools import AppHelper
+    except ImportError:
+        class NSURL(object):
+            @staticmethod
+            def fileURLWithPath_(path):
+                return types.SimpleNamespace(isFileReferenceURL=lambda: False)
+
+        foundation = types.ModuleType("Foundation")
+        foundation.NSURL = NSURL
+        sys.modules["Foundation"] = foundation
+        appkit = types.ModuleType("AppKit")
+        appkit.NSWorkspace = object
+        sys.modules["AppKit"] = appkit
+        objc_module = types.ModuleType("objc")
+        objc_module.lookUpClass = lambda name: object
+        sys.modules["objc"] = objc_module
+        app_helper = types.ModuleType("PyObjCTools.AppHelper")
+        app_helper.callAfter = lambda func, *args, **kwargs: func(*args, **kwargs)
+        pyobjc_tools = types.ModuleType("PyObjCTools")
+        pyobjc_tools.AppHelper = app_helper
+        sys.modules["PyObjCTools"] = pyobjc_tools
+        sys.modules["PyObjCTools.AppHelper"] = app_helper
+
+
+def load_script_finder():
+    install_stub_modules()
+    spec = importlib.util.spec_from_file_location("ScriptFinder", os.path.join(REPO_DIRECTORY, "ScriptFinder.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def random_words(rng, count, cjk_ratio):
+    return [rng.choice(CJK_WORDS) if rng.random() < cjk_ratio else rng.choice(LATIN_WORDS) for _ in range(count)]
+
+
+def join_words(words):
+    # 中文詞之間不加空格，英文詞之間加空格
+    text = ""
+    for word in words:
+        if text and (word.isascii() or text[-1].isascii()):
+            text += " "
+        text += word
+    return text
+
+
+def make_script_source(rng, args, index):
+    title = join_words(random_words(rng, rng.randint(1, 4), args.cjk_ratio))
+    description = "\n".join(
+        join_words(random_words(rng, rng.randint(4, 12), args.cjk_ratio)) for _ in range(rng.randint(1, 3)))
+    lines = []
+    if rng.random() >= args.library_ratio:
+        lines.append(f"# MenuTitle: {title} {index}")
+    lines.append("# -*- coding: utf-8 -*-")
+    lines.append(f"__doc__={DOC_QUOTES}\n{description}\n{DOC_QUOTES}")
+    lines.append("")
+    if rng.random() < args.gui_ratio:
+        lines.append("import vanilla")
+    lines.append("from GlyphsApp import *")
+    lines.append("")
+    source = "\n".join(lines) + "\n"
+    function_index = 0
+    while len(source.encode("utf-8")) < args.file_size:
+        source += (
+            f"\ndef helper_{function_index}(layer):\n"
+            f"    # {join_words(random_words(rng, 6, args.cjk_ratio))}\n"
+            f"    for path in layer.paths:\n"
+            f"        path.reverse()\n"
+            f"    return layer\n"
+        )
+        function_index += 1
+    return source
+
+
+# 產生合成的 Scripts 資料夾：作者資料夾放在 repos 下，Scripts 中以 alias_depth 層符號連結指向它們
+def generate_scripts_tree(root, args):
+    rng = random.Random(args.seed)
+    scripts_directory = os.path.join(root, "Scripts")
+    repos_directory = os.path.join(root, "repos")
+    os.makedirs(scripts_directory)
+    os.makedirs(repos_directory)
+
+    file_count = 0
+    for author_index in range(args.authors):
+        author = f"author{author_index:03d}"
+        author_path = os.path.join(repos_directory, author) if args.alias_depth else os.path.join(scripts_directory, author)
+        for script_index in range(args.scripts):
+            category = f"Category{script_index % args.categories}"
+            folder = os.path.join(author_path, category)
+            os.makedirs(folder, exist_ok=True)
+            with open(os.path.join(folder, f"script{script_index:05d}.py"), "w", encoding="utf-8") as f:
+                f.write(make_script_source(rng, args, script_index))
+            file_count += 1
+        # 模擬 git clone 下來的資料夾
+        git_objects = os.path.join(author_path, ".git", "objects")
+        os.makedirs(git_objects, exist_ok=True)
+        for object_index in range(args.git_files):
+            with open(os.path.join(git_objects, f"object{object_index:04d}.py"), "w") as f:
+                f.write("# MenuTitle: should be excluded\n")
+
+        if args.alias_depth:
+            target = author_path
+            for depth in range(args.alias_depth - 1):
+                link_path = os.path.join(repos_directory, f"{author}.link{depth}")
+                os.symlink(target, link_path)
+                target = link_path
+            os.symlink(target, os.path.join(scripts_directory, author))
+
+    # 指向相同資料夾的重複替身
+    for duplicate_index in range(min(args.duplicates, args.authors)):
+        os.symlink(os.path.join(scripts_directory, f"author{duplicate_index:03d}"),
+                   os.path.join(scripts_directory, f"duplicate{duplicate_index:03d}"))
+
+    return scripts_directory, file_count
+
+
+def make_queries(rng, script_names, count):
+    queries = []
+    while len(queries) < count:
+        name = rng.choice(script_names)
+        kind = rng.random()
+        if kind < 0.2:
+            queries.append(name[:1])
+        elif kind < 0.4:
+            queries.append(name[:2])
+        elif kind < 0.6:
+            queries.append(name.split(" ")[0])
+        elif kind < 0.75:
+            start = rng.randint(0, max(0, len(name) - 3))
+            queries.append(name[start:start + 3])
+        elif kind < 0.85:
+            queries.append(name)
+        elif kind < 0.95:
+            queries.append("".join(rng.sample(name.replace(" ", ""), min(3, len(name.replace(" ", ""))))))
+        else:
+            queries.append("zzqx")
+    return queries
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以位元組為單位，Linux 以 KB 為單位
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_benchmark(args):
+    script_finder = load_script_finder()
+    root = tempfile.mkdtemp(prefix="ScriptFinder_benchmark_")
+    results = {"parameters": vars(args).copy()}
+    try:
+        scripts_directory, file_count = generate_scripts_tree(root, args)
+        cache_path = os.path.join(root, "cache", "scripts_info.json")
+        results["files"] = file_count
+
+        def new_catalog(profiler=None):
+            info_cache = script_finder.ScriptInfoCache(cache_path)
+            info_cache.load()
+            return script_finder.ScriptCatalog(
+                scripts_directory, info_cache, max_workers=args.workers, profiler=profiler)
+
+        # 只測量解析：對每個檔案呼叫 extract_script_info
+        parser_catalog = new_catalog()
+        file_paths = [file_path for author_folder, file_path in parser_catalog.take_snapshot(scripts_directory)]
+        _, results["parse_seconds"] = timed(
+            lambda: [parser_catalog.extract_script_info(file_path, "author") for file_path in file_paths])
+
+        profiler = script_finder.ScriptProfiler(enabled=bool(args.trace))
+        catalog = new_catalog(profiler)
+        scripts_info, results["cold_scan_seconds"] = timed(catalog.scan)
+        if args.trace:
+            # 冷掃描的效能記錄，計時結果會包含記錄本身的額外負擔
+            profiler.dump(os.path.abspath(args.trace), chrome_trace=True)
+            profiler.enabled = False
+        results["scripts"] = len(scripts_info)
+        _, results["warm_scan_seconds"] = timed(new_catalog().scan)
+        _, results["refresh_seconds"] = timed(catalog.refresh)
+
+        search_index, results["index_build_seconds"] = timed(script_finder.ScriptSearchIndex, scripts_info)
+
+        rng = random.Random(args.seed)
+        queries = make_queries(rng, [script.script_name for script in scripts_info], args.queries)
+        def latency_summary(latencies):
+            latencies = sorted(latencies)
+            return {
+                "p50": percentile(latencies, 0.50),
+                "p90": percentile(latencies, 0.90),
+                "p99": percentile(latencies, 0.99),
+                "max": latencies[-1] if latencies else 0.0,
+            }
+
+        for method_name in ("rank", "search"):
+            method = getattr(search_index, method_name)
+            results[f"{method_name}_ms"] = latency_summary(timed(method, query)[1] * 1000 for query in queries)
+
+        # 模擬逐字輸入：每個查詢從第一個字元開始逐字輸入，最後再逐字刪除
+        typing_latencies = []
+        for query in queries[:max(1, len(queries) // 5)]:
+            prefixes = [query[:length] for length in range(1, len(query) + 1)]
+            for prefix in prefixes + prefixes[-2::-1]:
+                typing_latencies.append(timed(search_index.rank, prefix)[1] * 1000)
+        results["typing_ms"] = latency_summary(typing_latencies)
+
+        # 記憶體：另外以 tracemalloc 測量熱掃描加上建立索引的 Python 記憶體峰值，避免影響上面的計時
+        tracemalloc.start()
+        new_catalog().scan()
+        script_finder.ScriptSearchIndex(scripts_info)
+        results["traced_peak_mb"] = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+        results["peak_rss_mb"] = peak_rss_mb()
+    finally:
+        if args.keep:
+            print(f"保留合成資料夾：{root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+    return results
+
+
+def print_results(results):
+    print(f"檔案數：{results['files']}，腳本數：{results['scripts']}")
+    for key, label in (
+        ("parse_seconds", "解析 (extract_script_info)"),
+        ("cold_scan_seconds", "冷掃描"),
+        ("warm_scan_seconds", "熱掃描"),
+        ("refresh_seconds", "增量重新整理（無變更）"),
+        ("index_build_seconds", "建立搜尋索引"),
+    ):
+        print(f"{label:<28} {results[key] * 1000:10.1f} ms")
+    for method_name in ("rank", "search", "typing"):
+        latency = results[f"{method_name}_ms"]
+        print(f"搜尋 {method_name:<23} p50 {latency['p50']:.2f} ms  p90 {latency['p90']:.2f} ms  "
+              f"p99 {latency['p99']:.2f} ms  max {latency['max']:.2f} ms")
+    print(f"{'記憶體峰值 (tracemalloc)':<28} {results['traced_peak_mb']:10.1f} MB")
+    if results["peak_rss_mb"] is not None:
+        print(f"{'記憶體峰值 (RSS)':<28} {results['peak_rss_mb']:10.1f} MB")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="腳本搜尋器效能測試")
+    parser.add_argument("--authors", type=int, default=20, help="作者資料夾數量")
+    parser.add_argument("--scripts", type=int, default=200, help="每個作者的腳本數量")
+    parser.add_argument("--categories", type=int, default=8, help="每個作者的子資料夾數量")
+    parser.add_argument("--file-size", type=int, default=4000, help="每個腳本的大約位元組數")
+    parser.add_argument("--alias-depth", type=int, default=1, help="作者資料夾的符號連結層數（0 表示直接放在 Scripts 中）")
+    parser.add_argument("--duplicates", type=int, default=2, help="指向相同作者資料夾的重複替身數量")
+    parser.add_argument("--cjk-ratio", type=float, default=0.5, help="名稱與說明中中文詞的比例")
+    parser.add_argument("--gui-ratio", type=float, default=0.5, help="使用 vanilla 的腳本比例")
+    parser.add_argument("--library-ratio", type=float, default=0.1, help="沒有 MenuTitle 的檔案比例")
+    parser.add_argument("--git-files", type=int, default=50, help="每個作者 .git 資料夾中的檔案數量")
+    parser.add_argument("--queries", type=int, default=500, help="搜尋次數")
+    parser.add_argument("--workers", type=int, default=8, help="掃描執行緒數")
+    parser.add_argument("--seed", type=int, default=1, help="亂數種子")
+    parser.add_argument("--json", help="將結果寫入 JSON 檔案")
+    parser.add_argument("--trace", help="將冷掃描的 Chrome trace 寫入檔案")
+    parser.add_argument("--keep", action="store_true", help="保留產生的合成資料夾")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_arguments()
+    benchmark_results = run_benchmark(arguments)
+    print_results(benchmark_results)
+    if arguments.json:
+        with open(arguments.json, "w", encoding="utf-8") as f:
+            json.dump(benchmark_results, f, ensure_ascii=False, indent=2)